@@ -0,0 +1,842 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for generate_html.py.
+Synthesizes E2E test reports in the format extract_test_info expects and
+times the generator against them.
+"""
+
+import re
+import io
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+from pathlib import Path
+from datetime import datetime, timedelta
+
+import generate_html
+
+STEP_NAMES = [
+    "Intent Analysis",
+    "Content Research",
+    "Activity Creation",
+    "Safety Check",
+    "Activity Review",
+    "Formatting"
+]
+
+SEPARATOR = "=" * 60
+
+
+def synthesize_report(name: str = "Chanukah_Light_Miracle", steps: int = 6,
+                      transcript_kb: int = 4, output_kb: int = 16,
+                      truncated: bool = False, failed: bool = False, seed: int = 0) -> str:
+    """Build a synthetic test report markdown string.
+
+    A truncated report mimics a crashed run: no step has its Result/Duration
+    trailer and there is no final output. A failed report completes every
+    step but its last one fails and it has no final output.
+    """
+    rnd = random.Random(seed)
+    details = {
+        "activity_type": "religious_holiday",
+        "age_group": "middle",
+        "duration_minutes": 45,
+        "main_topic": "חנוכה - נס האור",
+        "main_values": ["אמונה", "נס", "אור בחושך"],
+        "closing_message_theme": "להיות אור לסביבה"
+    }
+    lines = [
+        f"# E2E Test Report: {name}",
+        "",
+        "| key | value |",
+        "|-----|-------|",
+        "| model | claude-opus-4-5 |",
+        "",
+        f"**User Request:** צור פעילות בנושא {name}",
+        "",
+        "```json",
+        json.dumps(details, ensure_ascii=False, indent=2),
+        "```",
+        "",
+    ]
+    transcript_line = "[tool_call] search_content query='אור' -> 12 results"
+    for i in range(steps):
+        lines += [SEPARATOR, f"STEP: {STEP_NAMES[i % len(STEP_NAMES)]}", SEPARATOR]
+        lines += [transcript_line] * (transcript_kb * 1024 // len(transcript_line))
+        if truncated:
+            continue
+        if failed and i == steps - 1:
+            result = 'FAIL'
+        else:
+            result = 'SUCCESS' if rnd.random() > 0.1 else 'FAIL'
+        lines += [f"Result: {result}", f"Duration: {rnd.uniform(5, 150):.1f}s", ""]
+    if truncated or failed:
+        return "\n".join(lines) + "\n"
+    section = ("## שלב {0}\n\nהמדריך מספר את **{1}** ושואל שאלות:\n"
+               "- {2}\n- איך אנחנו מביאים אור?\n\n"
+               "| זמן | פעילות |\n|-----|--------|\n| {3} דק' | פתיחה |\n")
+    stories = ["סיפור הנס", "סיפור המכבים", "משל הנר", "סיפור מהתלמוד"]
+    questions = ["מה היה הנס?", "מה למדנו מהסיפור?", "מה הייתם עושים במקומם?"]
+    body = []
+    size = 0
+    while size < output_kb * 1024:
+        body.append(section.format(len(body) + 1, rnd.choice(stories), rnd.choice(questions),
+                                   rnd.randint(5, 30)))
+        size += len(body[-1])
+    lines += ["## Final Output", "", "```markdown", "\n".join(body), "```", ""]
+    return "\n".join(lines) + "\n"
+
+
+def extract_test_info_regex(md_content: str) -> dict:
+    """Reference implementation: the original regex cascade."""
+    info = {}
+
+    title_match = re.search(r'# E2E Test Report: (\w+)', md_content)
+    if title_match:
+        info['name'] = title_match.group(1)
+        info['name_heb'] = generate_html.TEST_NAMES_HEB.get(info['name'], info['name'])
+
+    config_match = re.search(r'\| model \| (.+?) \|', md_content)
+    if config_match:
+        info['model'] = config_match.group(1)
+
+    request_match = re.search(r'\*\*User Request:\*\* (.+)', md_content)
+    if request_match:
+        info['user_request'] = request_match.group(1)
+
+    json_match = re.search(r'```json\n({[\s\S]*?})\n```', md_content)
+    if json_match:
+        try:
+            info['activity_details'] = json.loads(json_match.group(1))
+        except:
+            pass
+
+    final_output_match = re.search(r'## Final Output\n\n```markdown\n([\s\S]+?)```', md_content)
+    if final_output_match:
+        info['final_output'] = final_output_match.group(1).strip()
+    else:
+        final_output_match = re.search(r'## Final Output\n\n([\s\S]+?)(?=\n## |$)', md_content)
+        if final_output_match:
+            info['final_output'] = final_output_match.group(1).strip()
+
+    steps = []
+    step_pattern = r'STEP: (.+?)\n={10,}.*?Result: (\w+)\nDuration: ([\d.]+)s'
+    for match in re.finditer(step_pattern, md_content, re.DOTALL):
+        steps.append({
+            'name': match.group(1),
+            'duration': float(match.group(3)),
+            'status': match.group(2)
+        })
+    info['steps'] = steps
+    info['total_duration'] = sum(s['duration'] for s in steps) if steps else 0
+
+    return info
+
+
+# Reference: the original page template, with the CSS inlined (braces escaped
+# for str.format) and filled by str.format on every page
+LEGACY_HTML_TEMPLATE = '''<!DOCTYPE html>
+<html lang="he" dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link href="https://fonts.googleapis.com/css2?family=Heebo:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    <style>
+        :root {{
+            --primary: #2563eb;
+            --primary-dark: #1d4ed8;
+            --secondary: #64748b;
+            --success: #22c55e;
+            --danger: #ef4444;
+            --warning: #f59e0b;
+            --bg: #f8fafc;
+            --card-bg: #ffffff;
+            --text: #1e293b;
+            --text-muted: #64748b;
+            --border: #e2e8f0;
+        }}
+        
+        * {{
+            margin: 0;
+            padding: 0;
+            box-sizing: border-box;
+        }}
+        
+        body {{
+            font-family: 'Heebo', sans-serif;
+            background: var(--bg);
+            color: var(--text);
+            line-height: 1.7;
+            direction: rtl;
+        }}
+        
+        .container {{
+            max-width: 1200px;
+            margin: 0 auto;
+            padding: 2rem;
+        }}
+        
+        header {{
+            background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
+            color: white;
+            padding: 3rem 2rem;
+            margin-bottom: 2rem;
+            border-radius: 0 0 2rem 2rem;
+            box-shadow: 0 4px 20px rgba(37, 99, 235, 0.3);
+        }}
+        
+        header h1 {{
+            font-size: 2.5rem;
+            font-weight: 700;
+            margin-bottom: 0.5rem;
+        }}
+        
+        header p {{
+            opacity: 0.9;
+            font-size: 1.1rem;
+        }}
+        
+        .breadcrumb {{
+            margin-bottom: 1.5rem;
+        }}
+        
+        .breadcrumb a {{
+            color: var(--primary);
+            text-decoration: none;
+            font-weight: 500;
+        }}
+        
+        .breadcrumb a:hover {{
+            text-decoration: underline;
+        }}
+        
+        .card {{
+            background: var(--card-bg);
+            border-radius: 1rem;
+            padding: 2rem;
+            margin-bottom: 1.5rem;
+            box-shadow: 0 2px 10px rgba(0,0,0,0.05);
+            border: 1px solid var(--border);
+        }}
+        
+        .card h2 {{
+            color: var(--primary);
+            font-size: 1.5rem;
+            margin-bottom: 1rem;
+            padding-bottom: 0.5rem;
+            border-bottom: 2px solid var(--border);
+        }}
+        
+        .card h3 {{
+            color: var(--text);
+            font-size: 1.2rem;
+            margin: 1.5rem 0 0.75rem;
+        }}
+        
+        .stats-grid {{
+            display: grid;
+            grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
+            gap: 1rem;
+            margin-bottom: 2rem;
+        }}
+        
+        .stat-card {{
+            background: var(--card-bg);
+            border-radius: 1rem;
+            padding: 1.5rem;
+            text-align: center;
+            border: 1px solid var(--border);
+            transition: transform 0.2s, box-shadow 0.2s;
+        }}
+        
+        .stat-card:hover {{
+            transform: translateY(-2px);
+            box-shadow: 0 4px 15px rgba(0,0,0,0.1);
+        }}
+        
+        .stat-value {{
+            font-size: 2rem;
+            font-weight: 700;
+            color: var(--primary);
+        }}
+        
+        .stat-label {{
+            color: var(--text-muted);
+            font-size: 0.9rem;
+            margin-top: 0.25rem;
+        }}
+        
+        .test-list {{
+            display: grid;
+            gap: 1rem;
+        }}
+        
+        .test-item {{
+            display: flex;
+            align-items: center;
+            padding: 1.25rem;
+            background: var(--card-bg);
+            border-radius: 0.75rem;
+            border: 1px solid var(--border);
+            text-decoration: none;
+            color: var(--text);
+            transition: all 0.2s;
+        }}
+        
+        .test-item:hover {{
+            border-color: var(--primary);
+            box-shadow: 0 4px 15px rgba(37, 99, 235, 0.15);
+            transform: translateX(-4px);
+        }}
+        
+        .test-status {{
+            width: 40px;
+            height: 40px;
+            border-radius: 50%;
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            margin-left: 1rem;
+            font-size: 1.25rem;
+        }}
+        
+        .test-status.pass {{
+            background: #dcfce7;
+            color: var(--success);
+        }}
+        
+        .test-status.fail {{
+            background: #fee2e2;
+            color: var(--danger);
+        }}
+        
+        .test-info {{
+            flex: 1;
+        }}
+        
+        .test-name {{
+            font-weight: 600;
+            font-size: 1.1rem;
+            margin-bottom: 0.25rem;
+        }}
+        
+        .test-meta {{
+            color: var(--text-muted);
+            font-size: 0.85rem;
+        }}
+        
+        .test-duration {{
+            color: var(--secondary);
+            font-weight: 500;
+        }}
+        
+        .badge {{
+            display: inline-block;
+            padding: 0.25rem 0.75rem;
+            border-radius: 9999px;
+            font-size: 0.8rem;
+            font-weight: 500;
+            margin-left: 0.5rem;
+        }}
+        
+        .badge-primary {{
+            background: #dbeafe;
+            color: var(--primary);
+        }}
+        
+        .badge-success {{
+            background: #dcfce7;
+            color: var(--success);
+        }}
+        
+        .badge-danger {{
+            background: #fee2e2;
+            color: var(--danger);
+        }}
+        
+        table {{
+            width: 100%;
+            border-collapse: collapse;
+            margin: 1rem 0;
+        }}
+        
+        th, td {{
+            padding: 0.75rem 1rem;
+            text-align: right;
+            border-bottom: 1px solid var(--border);
+        }}
+        
+        th {{
+            background: var(--bg);
+            font-weight: 600;
+            color: var(--text-muted);
+        }}
+        
+        tr:hover {{
+            background: var(--bg);
+        }}
+        
+        .content-section {{
+            margin: 1.5rem 0;
+            padding: 1.5rem;
+            background: var(--bg);
+            border-radius: 0.75rem;
+            border-right: 4px solid var(--primary);
+        }}
+        
+        .content-section h4 {{
+            color: var(--primary);
+            margin-bottom: 0.75rem;
+        }}
+        
+        pre {{
+            background: #1e293b;
+            color: #e2e8f0;
+            padding: 1rem;
+            border-radius: 0.5rem;
+            overflow-x: auto;
+            direction: ltr;
+            text-align: left;
+            font-size: 0.85rem;
+            line-height: 1.5;
+        }}
+        
+        code {{
+            font-family: 'Fira Code', monospace;
+        }}
+        
+        .activity-content {{
+            line-height: 1.8;
+        }}
+        
+        .activity-content h1, .activity-content h2, .activity-content h3 {{
+            color: var(--primary);
+            margin: 1.5rem 0 1rem;
+        }}
+        
+        .activity-content ul, .activity-content ol {{
+            margin: 1rem 0;
+            padding-right: 2rem;
+        }}
+        
+        .activity-content li {{
+            margin: 0.5rem 0;
+        }}
+        
+        .activity-content blockquote {{
+            border-right: 4px solid var(--primary);
+            padding: 1rem 1.5rem;
+            margin: 1rem 0;
+            background: var(--bg);
+            border-radius: 0 0.5rem 0.5rem 0;
+            font-style: italic;
+        }}
+        
+        .activity-content hr {{
+            border: none;
+            border-top: 2px solid var(--border);
+            margin: 2rem 0;
+        }}
+        
+        footer {{
+            text-align: center;
+            padding: 2rem;
+            color: var(--text-muted);
+            border-top: 1px solid var(--border);
+            margin-top: 3rem;
+        }}
+        
+        @media (max-width: 768px) {{
+            .container {{
+                padding: 1rem;
+            }}
+            
+            header {{
+                padding: 2rem 1rem;
+            }}
+            
+            header h1 {{
+                font-size: 1.75rem;
+            }}
+            
+            .stats-grid {{
+                grid-template-columns: repeat(2, 1fr);
+            }}
+        }}
+    </style>
+</head>
+<body>
+    {content}
+    <footer>
+        <p>נוצר על ידי Agadah-Bot | מודל: Claude Opus 4.5 | {date}</p>
+    </footer>
+</body>
+</html>
+'''
+
+
+def write_corpus(folder: Path, count: int, steps: int = 6, transcript_kb: int = 4,
+                 output_kb: int = 16, failed_rate: float = 0.1, truncated_rate: float = 0.05,
+                 seed: int = 0) -> list:
+    """Write `count` synthetic test_*.md reports into folder and return their paths.
+
+    Names cycle through the known test names; the given fractions of reports
+    are failed or truncated variants.
+    """
+    rnd = random.Random(seed)
+    names = list(generate_html.TEST_NAMES_HEB)
+    start = datetime(2025, 11, 27, 1, 37, 55)
+    folder.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(count):
+        name = names[i % len(names)]
+        roll = rnd.random()
+        md_content = synthesize_report(name=name, steps=steps, transcript_kb=transcript_kb,
+                                       output_kb=output_kb, truncated=roll < truncated_rate,
+                                       failed=truncated_rate <= roll < truncated_rate + failed_rate,
+                                       seed=seed * 1000003 + i)
+        path = folder / f"test_{(start + timedelta(seconds=7 * i)).strftime('%Y%m%d_%H%M%S')}_{i:06d}_{name}.md"
+        path.write_text(md_content, encoding='utf-8')
+        paths.append(path)
+    return paths
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def best_of(func, repeat: int) -> float:
+    """Return the fastest of `repeat` timed calls, in seconds."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_parse(args):
+    """Compare the streaming parser with the regex cascade."""
+    print(f"{'report':>10} {'regex ms':>10} {'stream ms':>10} {'speedup':>8}")
+    for kb in args.sizes:
+        md_content = synthesize_report(transcript_kb=kb // 8, output_kb=kb // 4)
+        expected = extract_test_info_regex(md_content)
+        if generate_html.extract_test_info(md_content) != expected:
+            sys.exit(f"parser output differs from regex output for {kb} KB report")
+        regex_time = best_of(lambda: extract_test_info_regex(md_content), args.repeat)
+        stream_time = best_of(
+            lambda: generate_html.parse_test_report(io.StringIO(md_content, newline='\n')),
+            args.repeat)
+        size_kb = len(md_content.encode('utf-8')) // 1024
+        print(f"{size_kb:>8}KB {regex_time * 1000:>10.2f} {stream_time * 1000:>10.2f} "
+              f"{regex_time / stream_time:>7.2f}x")
+
+
+def bench_backtrack(args):
+    """Check that step scanning stays linear on truncated (crashed) reports."""
+    def truncated_report(kb):
+        return synthesize_report(steps=max(1, kb // args.step_kb), transcript_kb=args.step_kb,
+                                 truncated=True)
+
+    print("Regex cascade (for contrast):")
+    for kb in args.regex_sizes:
+        md_content = truncated_report(kb)
+        regex_time = best_of(lambda: extract_test_info_regex(md_content), 1)
+        print(f"{kb:>8}KB {regex_time * 1000:>10.1f} ms")
+
+    print("Streaming parser:")
+    per_mb = []
+    for mb in args.sizes:
+        md_content = truncated_report(mb * 1024)
+        size_mb = len(md_content.encode('utf-8')) / (1 << 20)
+        stream_time = best_of(
+            lambda: generate_html.parse_test_report(io.StringIO(md_content, newline='\n')),
+            args.repeat)
+        per_mb.append(stream_time / size_mb)
+        print(f"{size_mb:>8.1f}MB {stream_time * 1000:>10.1f} ms {per_mb[-1] * 1000:>8.1f} ms/MB")
+    ratio = max(per_mb) / min(per_mb)
+    if ratio > args.tolerance:
+        sys.exit(f"step scanning is not linear: time per MB varies {ratio:.2f}x "
+                 f"(tolerance {args.tolerance}x)")
+    print(f"OK: time per MB within {ratio:.2f}x across sizes")
+
+
+def bench_render(args):
+    """Time per-page template rendering: str.format vs. the precompiled template."""
+    test = generate_html.TestRecord.from_dict(
+        generate_html.extract_test_info(synthesize_report(output_kb=args.output_kb)))
+    test.final_output = None
+    date = generate_html.build_date()
+    content = generate_html.generate_test_html(test, date=date)
+    title = test.display_name
+    style = generate_html.INLINE_STYLE
+    if generate_html.PAGE.render(title=title, content=content, date=date, style=style) != \
+            generate_html.HTML_TEMPLATE.format(title=title, content=content, date=date, style=style):
+        sys.exit("precompiled template output differs from str.format")
+
+    def fill_format():
+        for _ in range(args.pages):
+            LEGACY_HTML_TEMPLATE.format(title=title, content=content, date=date)
+
+    def fill_precompiled():
+        for _ in range(args.pages):
+            generate_html.PAGE.render(title=title, content=content, date=date, style=style)
+
+    def full_page():
+        for _ in range(args.pages):
+            generate_html.generate_test_html(test, date=date)
+
+    print(f"{args.pages} pages, {len(content) // 1024} KB content slot")
+    for label, func in [("str.format (original)", fill_format),
+                        ("precompiled fill", fill_precompiled),
+                        ("generate_test_html", full_page)]:
+        elapsed = best_of(func, args.repeat)
+        print(f"{label:>22}: {elapsed * 1e6 / args.pages:8.1f} us/page")
+
+
+def bench_startup(args):
+    """Measure cold-start import time of generate_html with -X importtime."""
+    best = None
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import generate_html'],
+                              cwd=Path(__file__).parent, capture_output=True, text=True, check=True)
+        wall = time.perf_counter() - start
+        imports = {}
+        for line in proc.stderr.splitlines():
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            imports[name.strip()] = (int(self_us), int(cumulative_us))
+        if best is None or imports['generate_html'][1] < best[1]['generate_html'][1]:
+            best = (wall, imports)
+
+    wall, imports = best
+    print(f"generate_html import: {imports['generate_html'][1] / 1000:.1f} ms "
+          f"(process wall time {wall * 1000:.1f} ms, best of {args.repeat})")
+    print("Slowest imports (self time):")
+    for name, (self_us, _) in sorted(imports.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_us / 1000:>8.1f} ms  {name}")
+
+    if args.save:
+        record = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'import_ms': imports['generate_html'][1] / 1000,
+            'wall_ms': wall * 1000,
+            'modules': len(imports)
+        }
+        save_path = Path(args.save)
+        history = json.loads(save_path.read_text()) if save_path.exists() else []
+        history.append(record)
+        save_path.write_text(json.dumps(history, indent=2))
+
+    eager = [name for name in args.lazy if name in imports]
+    if eager:
+        sys.exit(f"imported at startup but should be lazy: {', '.join(eager)}")
+
+
+def bench_corpus(args):
+    """Write a synthetic corpus to a folder."""
+    paths = write_corpus(Path(args.folder), args.count, args.steps, args.transcript_kb,
+                         args.output_kb, args.failed_rate, args.truncated_rate, args.seed)
+    size_mb = sum(path.stat().st_size for path in paths) / (1 << 20)
+    print(f"Wrote {len(paths)} reports ({size_mb:.1f} MB) to {args.folder}")
+
+
+def git_revision() -> str:
+    """Short hash of the checked-out revision, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def bench_e2e(args):
+    """Time each phase of a build over a synthetic (or given) corpus."""
+    work = Path(tempfile.mkdtemp(prefix='bench-e2e-'))
+    try:
+        if args.corpus:
+            paths = sorted(Path(args.corpus).glob("test_*.md"))
+        else:
+            paths = write_corpus(work / "batch", args.count, args.steps, args.transcript_kb,
+                                 args.output_kb, args.failed_rate, args.truncated_rate, args.seed)
+        if not paths:
+            sys.exit("no test_*.md reports to benchmark")
+        source_mb = sum(path.stat().st_size for path in paths) / (1 << 20)
+        out_dir = work / "site"
+        out_dir.mkdir()
+        date = generate_html.build_date()
+        phases = {}
+        
+        def timed(name, func):
+            start = time.perf_counter()
+            result = func()
+            elapsed = time.perf_counter() - start
+            phases[name] = {
+                'seconds': round(elapsed, 4),
+                'reports_per_sec': round(len(paths) / elapsed, 1),
+                'mb_per_sec': round(source_mb / elapsed, 2),
+                'peak_rss_mb': round(peak_rss_mb(), 1)
+            }
+            return result
+        
+        tests = timed('parse', lambda: [generate_html.parse_test_file(path) for path in paths])
+        outputs = [test.final_output for test in tests if test.final_output]
+        converted = timed('markdown', lambda: {text: generate_html.convert_markdown(text) for text in outputs})
+        
+        # Render with the markdown already converted, so the phases don't overlap
+        pages = timed('render', lambda: [
+            generate_html.test_page_slots(test, date=date, final_output_html=converted.get(test.final_output))
+            for test in tests])
+        
+        def write_pages():
+            for test, slots in zip(tests, pages):
+                with generate_html.OutputStream(out_dir / f"{test.filename}.html", args.gzip) as out:
+                    generate_html.PAGE.write(out, **slots)
+        timed('write', write_pages)
+        
+        for test in tests:
+            test.final_output = None
+        # Free the phase results before timing the index (the lambdas above
+        # still reference the containers, so empty them rather than del)
+        pages.clear()
+        converted.clear()
+        outputs.clear()
+        timed('index', lambda: generate_html.write_index(tests, out_dir, date, page_size=args.page_size,
+                                                          precompress=args.gzip))
+        
+        # The whole pipeline as the command line runs it
+        generate_html.BATCH_DIR = paths[0].parent
+        generate_html.OUTPUT_DIR = work / "build"
+        build_args = ['build', '--force', '--no-markdown-cache', '--jobs', str(args.jobs),
+                      '--page-size', str(args.page_size)] + (['--gzip'] if args.gzip else [])
+        with open(os.devnull, 'w') as devnull:
+            stdout, sys.stdout = sys.stdout, devnull
+            try:
+                timed('build', lambda: generate_html.main(build_args))
+            finally:
+                sys.stdout = stdout
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    
+    print(f"{len(paths)} reports, {source_mb:.1f} MB")
+    print(f"{'phase':>10} {'seconds':>9} {'reports/s':>10} {'MB/s':>8} {'peak RSS MB':>12}")
+    for name, phase in phases.items():
+        print(f"{name:>10} {phase['seconds']:>9.3f} {phase['reports_per_sec']:>10.1f} "
+              f"{phase['mb_per_sec']:>8.2f} {phase['peak_rss_mb']:>12.1f}")
+    
+    if args.save:
+        record = {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'reports': len(paths),
+            'source_mb': round(source_mb, 2),
+            'options': {'jobs': args.jobs, 'gzip': args.gzip, 'page_size': args.page_size,
+                        'corpus': args.corpus, 'output_kb': args.output_kb, 'steps': args.steps},
+            'phases': phases
+        }
+        save_path = Path(args.save)
+        history = json.loads(save_path.read_text()) if save_path.exists() else []
+        previous = next((entry for entry in reversed(history)
+                         if entry['options'] == record['options'] and entry['reports'] == record['reports']),
+                        None)
+        if previous:
+            print(f"Compared with {previous['revision']} ({previous['date']}):")
+            for name, phase in phases.items():
+                if name in previous['phases']:
+                    ratio = phase['seconds'] / previous['phases'][name]['seconds']
+                    print(f"{name:>10} {(ratio - 1) * 100:+8.1f}%")
+        history.append(record)
+        save_path.write_text(json.dumps(history, indent=2))
+
+
+def add_corpus_arguments(parser):
+    """Options shaping a synthetic corpus."""
+    parser.add_argument('--count', type=int, default=200, help="number of reports")
+    parser.add_argument('--steps', type=int, default=6, help="steps per report")
+    parser.add_argument('--transcript-kb', type=int, default=4, help="transcript size per step in KB")
+    parser.add_argument('--output-kb', type=int, default=16, help="final output size in KB")
+    parser.add_argument('--failed-rate', type=float, default=0.1,
+                        help="fraction of reports with a failed last step and no final output")
+    parser.add_argument('--truncated-rate', type=float, default=0.05,
+                        help="fraction of reports cut off mid-run")
+    parser.add_argument('--seed', type=int, default=0)
+
+
+def main(argv=None):
+    """Run the selected benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmarks for generate_html.py.")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    parse_parser = subparsers.add_parser('parse', help="streaming parser vs. regex cascade")
+    parse_parser.add_argument('--sizes', type=int, nargs='+', default=[64, 512, 4096, 32768],
+                              help="approximate report sizes in KB")
+    parse_parser.add_argument('--repeat', type=int, default=5)
+    parse_parser.set_defaults(func=bench_parse)
+
+    backtrack_parser = subparsers.add_parser(
+        'backtrack', help="linear-scaling check on truncated reports")
+    backtrack_parser.add_argument('--sizes', type=int, nargs='+', default=[2, 4, 8, 16],
+                                  help="report sizes in MB")
+    backtrack_parser.add_argument('--step-kb', type=int, default=16,
+                                  help="transcript size per step in KB")
+    backtrack_parser.add_argument('--regex-sizes', type=int, nargs='*', default=[32, 64, 128],
+                                  help="report sizes in KB to time the regex cascade on")
+    backtrack_parser.add_argument('--tolerance', type=float, default=2.0,
+                                  help="maximum allowed spread of time per MB")
+    backtrack_parser.add_argument('--repeat', type=int, default=3)
+    backtrack_parser.set_defaults(func=bench_backtrack)
+
+    render_parser = subparsers.add_parser('render', help="per-page template rendering time")
+    render_parser.add_argument('--pages', type=int, default=10000)
+    render_parser.add_argument('--output-kb', type=int, default=16,
+                               help="final output size of the synthetic report")
+    render_parser.add_argument('--repeat', type=int, default=3)
+    render_parser.set_defaults(func=bench_render)
+
+    startup_parser = subparsers.add_parser('startup', help="cold-start import time via -X importtime")
+    startup_parser.add_argument('--repeat', type=int, default=5)
+    startup_parser.add_argument('--top', type=int, default=10,
+                                help="number of slowest imports to list")
+    startup_parser.add_argument('--lazy', nargs='*',
+                                default=['markdown', 'concurrent.futures.process', 'asyncio'],
+                                help="modules that must not be imported at startup")
+    startup_parser.add_argument('--save', metavar='FILE',
+                                help="append the result to a JSON history file")
+    startup_parser.set_defaults(func=bench_startup)
+
+    corpus_parser = subparsers.add_parser('corpus', help="write a synthetic test_*.md corpus")
+    corpus_parser.add_argument('folder', help="folder to write the reports to")
+    add_corpus_arguments(corpus_parser)
+    corpus_parser.set_defaults(func=bench_corpus)
+    
+    e2e_parser = subparsers.add_parser(
+        'e2e', help="time parse, markdown, render, write and index phases and a full build")
+    add_corpus_arguments(e2e_parser)
+    e2e_parser.add_argument('--corpus', metavar='DIR',
+                            help="benchmark the reports in DIR instead of a synthetic corpus")
+    e2e_parser.add_argument('--jobs', type=int, default=1, help="--jobs for the full build")
+    e2e_parser.add_argument('--gzip', action='store_true', help="also write .gz siblings")
+    e2e_parser.add_argument('--page-size', type=int, default=0, help="index page size")
+    e2e_parser.add_argument('--save', metavar='FILE',
+                            help="append the results to a JSON history file and compare with "
+                                 "its last entry run with the same options")
+    e2e_parser.set_defaults(func=bench_e2e)
+    
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,17 +4,49 @@ Generate HTML reports from E2E test markdown files.
 Creates a beautiful RTL Hebrew website with individual test reports.
 """
 
+import io
 import os
 import re
+import sys
+import math
+import mmap
+import gzip
+import glob
 import json
+import time
+import select
+import shutil
+import string
+import struct
+import hashlib
+import argparse
+import textwrap
+from array import array
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-import markdown
 
 # Source batch folder
 BATCH_DIR = Path(__file__).parent.parent / "batch_20251127_013755"
 OUTPUT_DIR = Path(__file__).parent
 
+# Build manifest used for incremental rebuilds
+MANIFEST_NAME = ".report-manifest.json"
+
+# Machine-readable counts, bytes and phase timings of the last build
+METRICS_NAME = "build-metrics.json"
+PHASES = ('parse', 'markdown', 'render', 'write')
+
+# On-disk cache of converted final outputs, keyed by content hash; entries
+# not used for this many days are pruned at the end of a build
+MARKDOWN_CACHE_NAME = ".markdown-cache"
+MARKDOWN_CACHE_MAX_AGE_DAYS = 30
+MARKDOWN_EXTENSIONS = ['tables', 'fenced_code']
+
+# Bump when a change to the parser or page layout should invalidate every
+# cached page (template and translation edits are picked up automatically)
+GENERATOR_VERSION = 3
+
 # Hebrew translations for test names
 TEST_NAMES_HEB = {
     "Chanukah_Light_Miracle": "חנוכה - נס האור",
@@ -45,15 +77,9 @@ AGE_GROUPS_HEB = {
     "teen": "נוער (14-16)"
 }
 
-HTML_TEMPLATE = '''<!DOCTYPE html>
-<html lang="he" dir="rtl">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <link href="https://fonts.googleapis.com/css2?family=Heebo:wght@300;400;500;600;700&display=swap" rel="stylesheet">
-    <style>
-        :root {{
+# Shared page stylesheet, inlined into every page by default or written once
+# as report.<hash>.css (see write_stylesheet)
+STYLESHEET = '''        :root {
             --primary: #2563eb;
             --primary-dark: #1d4ed8;
             --secondary: #64748b;
@@ -65,124 +91,124 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             --text: #1e293b;
             --text-muted: #64748b;
             --border: #e2e8f0;
-        }}
+        }
         
-        * {{
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: 'Heebo', sans-serif;
             background: var(--bg);
             color: var(--text);
             line-height: 1.7;
             direction: rtl;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1200px;
             margin: 0 auto;
             padding: 2rem;
-        }}
+        }
         
-        header {{
+        header {
             background: linear-gradient(135deg, var(--primary) 0%, var(--primary-dark) 100%);
             color: white;
             padding: 3rem 2rem;
             margin-bottom: 2rem;
             border-radius: 0 0 2rem 2rem;
             box-shadow: 0 4px 20px rgba(37, 99, 235, 0.3);
-        }}
+        }
         
-        header h1 {{
+        header h1 {
             font-size: 2.5rem;
             font-weight: 700;
             margin-bottom: 0.5rem;
-        }}
+        }
         
-        header p {{
+        header p {
             opacity: 0.9;
             font-size: 1.1rem;
-        }}
+        }
         
-        .breadcrumb {{
+        .breadcrumb {
             margin-bottom: 1.5rem;
-        }}
+        }
         
-        .breadcrumb a {{
+        .breadcrumb a {
             color: var(--primary);
             text-decoration: none;
             font-weight: 500;
-        }}
+        }
         
-        .breadcrumb a:hover {{
+        .breadcrumb a:hover {
             text-decoration: underline;
-        }}
+        }
         
-        .card {{
+        .card {
             background: var(--card-bg);
             border-radius: 1rem;
             padding: 2rem;
             margin-bottom: 1.5rem;
             box-shadow: 0 2px 10px rgba(0,0,0,0.05);
             border: 1px solid var(--border);
-        }}
+        }
         
-        .card h2 {{
+        .card h2 {
             color: var(--primary);
             font-size: 1.5rem;
             margin-bottom: 1rem;
             padding-bottom: 0.5rem;
             border-bottom: 2px solid var(--border);
-        }}
+        }
         
-        .card h3 {{
+        .card h3 {
             color: var(--text);
             font-size: 1.2rem;
             margin: 1.5rem 0 0.75rem;
-        }}
+        }
         
-        .stats-grid {{
+        .stats-grid {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(200px, 1fr));
             gap: 1rem;
             margin-bottom: 2rem;
-        }}
+        }
         
-        .stat-card {{
+        .stat-card {
             background: var(--card-bg);
             border-radius: 1rem;
             padding: 1.5rem;
             text-align: center;
             border: 1px solid var(--border);
             transition: transform 0.2s, box-shadow 0.2s;
-        }}
+        }
         
-        .stat-card:hover {{
+        .stat-card:hover {
             transform: translateY(-2px);
             box-shadow: 0 4px 15px rgba(0,0,0,0.1);
-        }}
+        }
         
-        .stat-value {{
+        .stat-value {
             font-size: 2rem;
             font-weight: 700;
             color: var(--primary);
-        }}
+        }
         
-        .stat-label {{
+        .stat-label {
             color: var(--text-muted);
             font-size: 0.9rem;
             margin-top: 0.25rem;
-        }}
+        }
         
-        .test-list {{
+        .test-list {
             display: grid;
             gap: 1rem;
-        }}
+        }
         
-        .test-item {{
+        .test-item {
             display: flex;
             align-items: center;
             padding: 1.25rem;
@@ -192,15 +218,15 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             text-decoration: none;
             color: var(--text);
             transition: all 0.2s;
-        }}
+        }
         
-        .test-item:hover {{
+        .test-item:hover {
             border-color: var(--primary);
             box-shadow: 0 4px 15px rgba(37, 99, 235, 0.15);
             transform: translateX(-4px);
-        }}
+        }
         
-        .test-status {{
+        .test-status {
             width: 40px;
             height: 40px;
             border-radius: 50%;
@@ -209,98 +235,98 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             justify-content: center;
             margin-left: 1rem;
             font-size: 1.25rem;
-        }}
+        }
         
-        .test-status.pass {{
+        .test-status.pass {
             background: #dcfce7;
             color: var(--success);
-        }}
+        }
         
-        .test-status.fail {{
+        .test-status.fail {
             background: #fee2e2;
             color: var(--danger);
-        }}
+        }
         
-        .test-info {{
+        .test-info {
             flex: 1;
-        }}
+        }
         
-        .test-name {{
+        .test-name {
             font-weight: 600;
             font-size: 1.1rem;
             margin-bottom: 0.25rem;
-        }}
+        }
         
-        .test-meta {{
+        .test-meta {
             color: var(--text-muted);
             font-size: 0.85rem;
-        }}
+        }
         
-        .test-duration {{
+        .test-duration {
             color: var(--secondary);
             font-weight: 500;
-        }}
+        }
         
-        .badge {{
+        .badge {
             display: inline-block;
             padding: 0.25rem 0.75rem;
             border-radius: 9999px;
             font-size: 0.8rem;
             font-weight: 500;
             margin-left: 0.5rem;
-        }}
+        }
         
-        .badge-primary {{
+        .badge-primary {
             background: #dbeafe;
             color: var(--primary);
-        }}
+        }
         
-        .badge-success {{
+        .badge-success {
             background: #dcfce7;
             color: var(--success);
-        }}
+        }
         
-        .badge-danger {{
+        .badge-danger {
             background: #fee2e2;
             color: var(--danger);
-        }}
+        }
         
-        table {{
+        table {
             width: 100%;
             border-collapse: collapse;
             margin: 1rem 0;
-        }}
+        }
         
-        th, td {{
+        th, td {
             padding: 0.75rem 1rem;
             text-align: right;
             border-bottom: 1px solid var(--border);
-        }}
+        }
         
-        th {{
+        th {
             background: var(--bg);
             font-weight: 600;
             color: var(--text-muted);
-        }}
+        }
         
-        tr:hover {{
+        tr:hover {
             background: var(--bg);
-        }}
+        }
         
-        .content-section {{
+        .content-section {
             margin: 1.5rem 0;
             padding: 1.5rem;
             background: var(--bg);
             border-radius: 0.75rem;
             border-right: 4px solid var(--primary);
-        }}
+        }
         
-        .content-section h4 {{
+        .content-section h4 {
             color: var(--primary);
             margin-bottom: 0.75rem;
-        }}
+        }
         
-        pre {{
+        pre {
             background: #1e293b;
             color: #e2e8f0;
             padding: 1rem;
@@ -310,71 +336,137 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
             text-align: left;
             font-size: 0.85rem;
             line-height: 1.5;
-        }}
+        }
         
-        code {{
+        code {
             font-family: 'Fira Code', monospace;
-        }}
+        }
         
-        .activity-content {{
+        .activity-content {
             line-height: 1.8;
-        }}
+        }
         
-        .activity-content h1, .activity-content h2, .activity-content h3 {{
+        .activity-content h1, .activity-content h2, .activity-content h3 {
             color: var(--primary);
             margin: 1.5rem 0 1rem;
-        }}
+        }
         
-        .activity-content ul, .activity-content ol {{
+        .activity-content ul, .activity-content ol {
             margin: 1rem 0;
             padding-right: 2rem;
-        }}
+        }
         
-        .activity-content li {{
+        .activity-content li {
             margin: 0.5rem 0;
-        }}
+        }
         
-        .activity-content blockquote {{
+        .activity-content blockquote {
             border-right: 4px solid var(--primary);
             padding: 1rem 1.5rem;
             margin: 1rem 0;
             background: var(--bg);
             border-radius: 0 0.5rem 0.5rem 0;
             font-style: italic;
-        }}
+        }
         
-        .activity-content hr {{
+        .activity-content hr {
             border: none;
             border-top: 2px solid var(--border);
             margin: 2rem 0;
-        }}
+        }
+        
+        .pagination {
+            display: flex;
+            flex-wrap: wrap;
+            align-items: center;
+            justify-content: center;
+            gap: 0.5rem;
+            margin-top: 1.5rem;
+        }
         
-        footer {{
+        .pagination a, .pagination button {
+            padding: 0.4rem 0.9rem;
+            border-radius: 0.5rem;
+            border: 1px solid var(--border);
+            background: var(--card-bg);
+            color: var(--primary);
+            font: inherit;
+            text-decoration: none;
+            cursor: pointer;
+        }
+        
+        .pagination a:hover, .pagination button:hover {
+            border-color: var(--primary);
+        }
+        
+        .pagination .current {
+            color: var(--text-muted);
+        }
+        
+        .search-box {
+            margin-bottom: 1.5rem;
+        }
+        
+        .search-box input {
+            width: 100%;
+            padding: 0.75rem 1rem;
+            border: 1px solid var(--border);
+            border-radius: 0.75rem;
+            font: inherit;
+        }
+        
+        .search-box input:focus {
+            outline: none;
+            border-color: var(--primary);
+        }
+        
+        .search-results {
+            display: grid;
+            gap: 0.5rem;
+            margin-top: 1rem;
+        }
+        
+        .search-results:empty {
+            display: none;
+        }
+        
+        footer {
             text-align: center;
             padding: 2rem;
             color: var(--text-muted);
             border-top: 1px solid var(--border);
             margin-top: 3rem;
-        }}
+        }
         
-        @media (max-width: 768px) {{
-            .container {{
+        @media (max-width: 768px) {
+            .container {
                 padding: 1rem;
-            }}
+            }
             
-            header {{
+            header {
                 padding: 2rem 1rem;
-            }}
+            }
             
-            header h1 {{
+            header h1 {
                 font-size: 1.75rem;
-            }}
+            }
             
-            .stats-grid {{
+            .stats-grid {
                 grid-template-columns: repeat(2, 1fr);
-            }}
-        }}
-    </style>
+            }
+        }
+'''
+
+INLINE_STYLE = '<style>\n' + STYLESHEET + '    </style>'
+
+HTML_TEMPLATE = '''<!DOCTYPE html>
+<html lang="he" dir="rtl">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <link href="https://fonts.googleapis.com/css2?family=Heebo:wght@300;400;500;600;700&display=swap" rel="stylesheet">
+    {style}
 </head>
 <body>
     {content}
@@ -385,72 +477,613 @@ HTML_TEMPLATE = '''<!DOCTYPE html>
 </html>
 '''
 
+
+
+class PageTemplate:
+    """A page template split once into static chunks and named slots.
+
+    Pages are assembled by joining the precomputed chunks instead of
+    re-parsing the template (and its escaped CSS braces) with str.format.
+    """
+
+    def __init__(self, template: str):
+        self._parts = [(literal, field) for literal, field, _, _ in string.Formatter().parse(template)]
+
+    def chunks(self, **slots):
+        """Yield the page as strings; list-valued slots are expanded in place."""
+        for literal, field in self._parts:
+            yield literal
+            if field is not None:
+                value = slots[field]
+                if isinstance(value, list):
+                    yield from value
+                else:
+                    yield str(value)
+
+    def render(self, **slots) -> str:
+        """Return the complete page."""
+        return ''.join(self.chunks(**slots))
+    
+    def write(self, out, **slots):
+        """Write the page chunk by chunk to a text stream such as OutputStream."""
+        for chunk in self.chunks(**slots):
+            out.write(chunk)
+
+
+PAGE = PageTemplate(HTML_TEMPLATE)
+
+TITLE_RE = re.compile(r'# E2E Test Report: (\w+)')
+MODEL_RE = re.compile(r'\| model \| (.+?) \|')
+REQUEST_RE = re.compile(r'\*\*User Request:\*\* (.+)')
+STEP_RESULT_RE = re.compile(r'Result: (\w+)$')
+STEP_DURATION_RE = re.compile(r'Duration: ([\d.]+)s')
+
+
+class ReportParser:
+    """Single-pass, line-oriented parser for E2E test report markdown.
+
+    Feed it lines (with their trailing newline, as produced by iterating a
+    text file) and call close() to get the same dict the old regex cascade
+    built from the fully loaded string, except that a step missing its
+    Result/Duration trailer is dropped instead of borrowing the next step's.
+    Only the captured fragments (activity JSON, final output, step names) are
+    held in memory.
+    """
+
+    def __init__(self):
+        self._name = None
+        self._model = None
+        self._request = None
+        # Activity JSON: None -> 'open' (after ```json) -> 'capture' -> 'done'
+        self._json_state = None
+        self._json_lines = []
+        self._json_can_close = False
+        self._json_text = None
+        # Final output: primary (```markdown fenced) and fallback captures
+        self._fenced = None        # list of lines while capturing, 'done' afterwards
+        self._fenced_text = None
+        self._fallback = None      # list of lines while capturing, 'done' afterwards
+        self._fallback_text = None
+        self._marker_at = None     # index of the line ending with '## Final Output'
+        self._line_no = 0
+        # Steps: 'step' (between blocks) -> 'trailer' (inside a step block)
+        self._step_state = 'step'
+        self._step_header = None   # name from a STEP: line awaiting its ===== line
+        self._step_name = None
+        self._step_result = None
+        self._steps = []
+
+    def feed(self, raw: str):
+        """Consume one line of the report."""
+        has_nl = raw.endswith('\n')
+        line = raw[:-1] if has_nl else raw
+
+        if self._name is None and '# E2E Test Report: ' in line:
+            match = TITLE_RE.search(line)
+            if match:
+                self._name = match.group(1)
+        if self._model is None and '| model | ' in line:
+            match = MODEL_RE.search(line)
+            if match:
+                self._model = match.group(1)
+        if self._request is None and '**User Request:** ' in line:
+            match = REQUEST_RE.search(line)
+            if match:
+                self._request = match.group(1)
+
+        if self._json_state != 'done':
+            self._feed_json(line, has_nl)
+        # Only dispatch lines that can change a capture state
+        if self._fenced != 'done' and (self._fenced is not None or self._marker_at is not None
+                                       or isinstance(self._fallback, list)
+                                       or line.endswith('## Final Output')):
+            self._feed_final_output(line, has_nl)
+        if (self._step_header is not None or 'STEP: ' in line
+                or (self._step_state == 'trailer' and (self._step_result is not None or 'Result: ' in line))):
+            self._feed_steps(line, has_nl)
+
+        self._line_no += 1
+
+    def wake_anchors(self):
+        """Return the UTF-8 strings of which a line must contain one to matter.
+
+        Lines containing none of them would leave the parser unchanged, so a
+        caller may skip them. Returns None while every line matters (inside
+        a capture, or right after a line that opened one).
+        """
+        if (self._json_state not in (None, 'done') or self._marker_at is not None
+                or self._fenced not in (None, 'done') or isinstance(self._fallback, list)
+                or self._step_header is not None
+                or (self._step_state == 'trailer' and self._step_result is not None)):
+            return None
+        anchors = [b'STEP: ']
+        if self._step_state == 'trailer':
+            anchors.append(b'Result: ')
+        if self._name is None:
+            anchors.append(b'# E2E Test Report: ')
+        if self._model is None:
+            anchors.append(b'| model | ')
+        if self._request is None:
+            anchors.append(b'**User Request:** ')
+        if self._json_state is None:
+            anchors.append(b'```json')
+        if self._fenced != 'done':
+            anchors.append(b'## Final Output')
+        return anchors
+
+    def _feed_json(self, line: str, has_nl: bool):
+        # ```json\n{ ... }\n``` -- the block ends at the first line ending in
+        # '}' that is followed by a line starting with ```
+        if self._json_state == 'capture':
+            if self._json_can_close and line.startswith('```'):
+                self._json_text = '\n'.join(self._json_lines)
+                self._json_lines = []
+                self._json_state = 'done'
+                return
+            self._json_lines.append(line)
+            self._json_can_close = has_nl and line.endswith('}')
+            return
+        if self._json_state == 'open' and line.startswith('{'):
+            self._json_state = 'capture'
+            self._json_lines = [line]
+            self._json_can_close = has_nl and len(line) > 1 and line.endswith('}')
+            return
+        self._json_state = 'open' if has_nl and line.endswith('```json') else None
+
+    def _feed_final_output(self, line: str, has_nl: bool):
+        # Primary form: '## Final Output\n\n```markdown\n' ... up to the next ```
+        fenced = self._fenced
+        if fenced is not None:
+            end = line.find('```', 1 if not fenced else 0)
+            if end >= 0:
+                fenced.append(line[:end])
+                self._fenced_text = '\n'.join(fenced).strip()
+                self._fenced = 'done'
+                self._fallback = 'done'
+                return
+            fenced.append(line)
+
+        # Fallback form: '## Final Output\n\n' ... up to the next '## ' header
+        fallback = self._fallback
+        if isinstance(fallback, list):
+            if line.startswith('## ') and not (len(fallback) == 1 and fallback[0] == ''):
+                self._fallback_text = '\n'.join(fallback).strip()
+                self._fallback = 'done'
+            else:
+                fallback.append(line)
+
+        if self._marker_at is not None and self._line_no == self._marker_at + 2:
+            if fallback is None:
+                self._fallback = [line]
+            if fenced is None and line == '```markdown' and has_nl:
+                self._fenced = []
+        if has_nl and line.endswith('## Final Output'):
+            self._marker_at = self._line_no
+        elif not (self._marker_at == self._line_no - 1 and line == '' and has_nl):
+            self._marker_at = None
+
+    def _feed_steps(self, line: str, has_nl: bool):
+        # Each step is its own block: a 'STEP: <name>' line directly followed
+        # by a '=====' line, closed by 'Result: <word>\nDuration: <secs>s'. A
+        # new header abandons a step whose trailer never came (crashed test),
+        # so every line is looked at once no matter how the report ends.
+        header = self._step_header
+        self._step_header = None
+        if header is not None and line.startswith('=========='):
+            self._step_name = header
+            self._step_result = None
+            self._step_state = 'trailer'
+            return
+        col = 0
+        if self._step_state == 'trailer':
+            match = STEP_DURATION_RE.match(line) if self._step_result is not None else None
+            if match:
+                self._steps.append({
+                    'name': self._step_name,
+                    'duration': float(match.group(1)),
+                    'status': self._step_result
+                })
+                self._step_state = 'step'
+                self._step_name = self._step_result = None
+                col = match.end()
+            else:
+                match = STEP_RESULT_RE.search(line) if has_nl and 'Result: ' in line else None
+                self._step_result = match.group(1) if match else None
+        start = line.find('STEP: ', col)
+        if start >= 0 and has_nl and len(line) > start + 6:
+            self._step_header = line[start + 6:]
+
+    def close(self) -> dict:
+        """Finish parsing and return the extracted test information."""
+        info = {}
+        if self._name is not None:
+            info['name'] = self._name
+            info['name_heb'] = TEST_NAMES_HEB.get(self._name, self._name)
+        if self._model is not None:
+            info['model'] = self._model
+        if self._request is not None:
+            info['user_request'] = self._request
+        if self._json_text is not None:
+            try:
+                info['activity_details'] = json.loads(self._json_text)
+            except:
+                pass
+        if self._fenced_text is not None:
+            info['final_output'] = self._fenced_text
+        elif isinstance(self._fallback, list):
+            info['final_output'] = '\n'.join(self._fallback).strip()
+        elif self._fallback_text is not None:
+            info['final_output'] = self._fallback_text
+        info['steps'] = self._steps
+        info['total_duration'] = sum(s['duration'] for s in self._steps) if self._steps else 0
+        return info
+
+
+def parse_test_report(lines) -> dict:
+    """Parse a report from an iterable of lines, e.g. an open text file."""
+    parser = ReportParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.close()
+
+
+# Reports at least this big are parsed from their bytes by parse_report_buffer();
+# below it, decoding every line is cheaper than skipping between anchors
+MMAP_MIN_SIZE = 1 << 17
+
+
+def parse_report_buffer(data) -> dict:
+    """Parse a report from its UTF-8 bytes, e.g. an mmap of the file.
+
+    Lines are located with byte-level searches and only those the parser
+    needs are decoded, jumping over the rest (tool transcripts can run to
+    hundreds of MB) to the next line holding one of its wake_anchors(). Like
+    a text file opened with newline=None, '\r\n' and a lone '\r' end a line
+    and are read as '\n'. The result matches parse_test_report() on the text
+    file, except that bytes which are not valid UTF-8 only raise if they are
+    in a line that is read.
+    """
+    parser = ReportParser()
+    size = len(data)
+    found = {}                 # anchor -> position of its next occurrence (-1: none left)
+    next_cr = data.find(b'\r')  # next '\r' (searched again once below pos; -1: none left)
+    pos = 0
+    while pos < size:
+        anchors = parser.wake_anchors()
+        if anchors is not None:
+            nearest = size
+            for anchor in anchors:
+                at = found.get(anchor, pos)
+                if 0 <= at < pos:
+                    at = pos
+                if at == pos:
+                    at = found[anchor] = data.find(anchor, pos)
+                if 0 <= at < nearest:
+                    nearest = at
+            if nearest == size:
+                break
+            start = data.rfind(b'\n', pos, nearest)
+            if next_cr >= 0:
+                start = max(start, data.rfind(b'\r', pos, nearest))
+            pos = start + 1 or pos
+        end = data.find(b'\n', pos)
+        if 0 <= next_cr < pos:
+            next_cr = data.find(b'\r', pos)
+        if next_cr >= 0 and (end < 0 or next_cr < end):
+            # The line ends at '\r' or '\r\n', either read as '\n'
+            parser.feed(data[pos:next_cr].decode('utf-8') + '\n')
+            pos = next_cr + 2 if next_cr + 1 == end else next_cr + 1
+        else:
+            end = end + 1 or size
+            parser.feed(data[pos:end].decode('utf-8'))
+            pos = end
+    return parser.close()
+
+
 def extract_test_info(md_content: str) -> dict:
     """Extract test information from markdown content."""
-    info = {}
-    
-    # Extract test name from title
-    title_match = re.search(r'# E2E Test Report: (\w+)', md_content)
-    if title_match:
-        info['name'] = title_match.group(1)
-        info['name_heb'] = TEST_NAMES_HEB.get(info['name'], info['name'])
-    
-    # Extract configuration
-    config_match = re.search(r'\| model \| (.+?) \|', md_content)
-    if config_match:
-        info['model'] = config_match.group(1)
-    
-    # Extract user request
-    request_match = re.search(r'\*\*User Request:\*\* (.+)', md_content)
-    if request_match:
-        info['user_request'] = request_match.group(1)
-    
-    # Extract activity details JSON
-    json_match = re.search(r'```json\n({[\s\S]*?})\n```', md_content)
-    if json_match:
-        try:
-            info['activity_details'] = json.loads(json_match.group(1))
-        except:
-            pass
+    return parse_test_report(io.StringIO(md_content, newline='\n'))
+
+
+class StepRecord:
+    """Name, duration and result of one pipeline step."""
     
-    # Extract final output (the activity plan)
-    # The final output is wrapped in ```markdown ... ``` code block
-    final_output_match = re.search(r'## Final Output\n\n```markdown\n([\s\S]+?)```', md_content)
-    if final_output_match:
-        info['final_output'] = final_output_match.group(1).strip()
-    else:
-        # Fallback: try without code block wrapper
-        final_output_match = re.search(r'## Final Output\n\n([\s\S]+?)(?=\n## |$)', md_content)
-        if final_output_match:
-            info['final_output'] = final_output_match.group(1).strip()
-    
-    # Extract step timings
-    # Format in markdown is: STEP: Name ... Result: SUCCESS/FAIL ... Duration: X.Xs
-    steps = []
-    step_pattern = r'STEP: (.+?)\n={10,}.*?Result: (\w+)\nDuration: ([\d.]+)s'
-    for match in re.finditer(step_pattern, md_content, re.DOTALL):
-        steps.append({
-            'name': match.group(1),
-            'duration': float(match.group(3)),
-            'status': match.group(2)
-        })
-    info['steps'] = steps
+    __slots__ = ('name', 'duration', 'status')
+    
+    def __init__(self, name: str, duration: float, status: str):
+        self.name = name
+        self.duration = duration
+        self.status = status
+
+
+class TestRecord:
+    """Parsed summary of one test report.
+
+    Slotted so that a batch of tens of thousands of tests stays small in
+    memory; final_output is only kept until the test's own page is written.
+    Converts to and from the extract_test_info() dict, which is also the form
+    stored in the build manifest.
+    """
+    
+    __slots__ = ('filename', 'status', 'name', 'name_heb', 'model', 'user_request',
+                 'activity_details', 'final_output', 'steps', 'total_duration')
+    
+    # Keys extract_test_info() only sets when found, in the order it sets them
+    OPTIONAL_FIELDS = ('name', 'name_heb', 'model', 'user_request', 'activity_details', 'final_output')
+    
+    def __init__(self, filename: str = None, status: str = None, steps: list = None,
+                 total_duration: float = 0, **optional):
+        self.filename = filename
+        self.status = status
+        self.steps = steps or []
+        self.total_duration = total_duration
+        for field in self.OPTIONAL_FIELDS:
+            setattr(self, field, optional.pop(field, None))
+        if optional:
+            raise TypeError(f"unknown TestRecord fields: {', '.join(optional)}")
     
-    # Calculate total duration
-    info['total_duration'] = sum(s['duration'] for s in steps) if steps else 0
+    @classmethod
+    def from_dict(cls, info: dict) -> 'TestRecord':
+        """Build a record from an extract_test_info() or manifest dict."""
+        fields = dict(info)
+        fields['steps'] = [StepRecord(s['name'], s['duration'], s['status']) for s in info.get('steps', [])]
+        return cls(**fields)
     
-    return info
+    def to_dict(self) -> dict:
+        """Return the record as a JSON-serializable dict."""
+        info = {}
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                info[field] = value
+        info['steps'] = [{'name': s.name, 'duration': s.duration, 'status': s.status} for s in self.steps]
+        info['total_duration'] = self.total_duration
+        info['filename'] = self.filename
+        info['status'] = self.status
+        return info
+    
+    @property
+    def display_name(self) -> str:
+        """Hebrew name, falling back to 'Unknown' for reports without a title."""
+        return self.name_heb if self.name_heb is not None else 'Unknown'
+    
+    @property
+    def details(self) -> dict:
+        """Activity details, or an empty dict if the report had none."""
+        return self.activity_details or {}
+
+
+class StatusPolicy:
+    """Decides whether a parsed test passed, from its step results.
+
+    A test fails if no step completed (the run crashed before its first
+    Result/Duration trailer), if any step's result is not one of
+    success_results (e.g. FAIL or TIMEOUT), if any step took longer than
+    step_timeout seconds, or, unless allow_missing_output is set, if the
+    report has no final output.
+    """
+    
+    __slots__ = ('success_results', 'step_timeout', 'allow_missing_output')
+    
+    def __init__(self, success_results=('SUCCESS',), step_timeout: float = None,
+                 allow_missing_output: bool = False):
+        self.success_results = frozenset(success_results)
+        self.step_timeout = step_timeout
+        self.allow_missing_output = allow_missing_output
+    
+    def status(self, test: TestRecord) -> str:
+        """Return 'PASS' or 'FAIL' for a test whose final output is still loaded."""
+        if not test.steps:
+            return 'FAIL'
+        for step in test.steps:
+            if step.status not in self.success_results:
+                return 'FAIL'
+            if self.step_timeout is not None and step.duration > self.step_timeout:
+                return 'FAIL'
+        if not test.final_output and not self.allow_missing_output:
+            return 'FAIL'
+        return 'PASS'
+    
+    def key(self) -> str:
+        """Stable string form, for telling apart summaries built under different policies."""
+        return json.dumps([sorted(self.success_results), self.step_timeout, self.allow_missing_output])
+
+
+DEFAULT_STATUS_POLICY = StatusPolicy()
+
+
+# Columns of the rows in index.json
+INDEX_FIELDS = ['filename', 'name', 'passed', 'activity_type', 'age_group',
+                'duration_minutes', 'total_duration']
+
+# Appends the following index pages in place, fetching index.json on first use
+INDEX_SCRIPT = '''
+    <script>
+    document.querySelectorAll('.pagination .load-more').forEach(function (button) {
+        var nav = button.closest('.pagination');
+        var list = document.querySelector('.test-list');
+        var shown = Number(nav.dataset.page);
+        var index = null;
+        function esc(value) {
+            var div = document.createElement('div');
+            div.textContent = value;
+            return div.innerHTML;
+        }
+        button.addEventListener('click', function () {
+            (index ? Promise.resolve(index) : fetch(nav.dataset.index).then(function (r) {
+                return r.json();
+            })).then(function (data) {
+                index = data;
+                data.tests.slice(shown * data.page_size, (shown + 1) * data.page_size).forEach(function (t) {
+                    var item = document.createElement('a');
+                    item.className = 'test-item';
+                    item.href = t[0] + '.html';
+                    item.innerHTML = '<div class="test-status ' + (t[2] ? 'pass">✓' : 'fail">✗') + '</div>' +
+                        '<div class="test-info"><div class="test-name">' + esc(t[1]) + '</div>' +
+                        '<div class="test-meta"><span class="badge badge-primary">' + esc(t[3]) + '</span>' +
+                        '<span class="badge badge-primary">' + esc(t[4]) + '</span>' +
+                        '<span class="badge badge-primary">' + esc(t[5]) + ' דקות</span></div></div>' +
+                        '<div class="test-duration">' + (t[6] / 60).toFixed(1) + " דק'</div>";
+                    list.appendChild(item);
+                });
+                shown += 1;
+                if (shown >= data.pages) {
+                    button.remove();
+                }
+            });
+        });
+    });
+    </script>
+    '''
+
+
+# Search index layout: terms are sharded by their first SEARCH_PREFIX
+# characters, and (filename, name) pairs are stored SEARCH_DOC_CHUNK per file
+SEARCH_DIR = "search"
+SEARCH_PREFIX = 2
+SEARCH_DOC_CHUNK = 1000
+
+SEARCH_BOX = f'''
+            <div class="search-box" data-root="{SEARCH_DIR}/" data-prefix="{SEARCH_PREFIX}" data-chunk="{SEARCH_DOC_CHUNK}">
+                <input type="search" placeholder="חיפוש בדוחות..." aria-label="חיפוש בדוחות">
+                <div class="search-results"></div>
+            </div>
+            '''
+
+# Queries the sharded search index, fetching only the shards and doc chunks it needs
+SEARCH_SCRIPT = '''
+    <script>
+    document.querySelectorAll('.search-box').forEach(function (box) {
+        var input = box.querySelector('input');
+        var results = box.querySelector('.search-results');
+        var root = box.dataset.root;
+        var prefix = Number(box.dataset.prefix);
+        var chunk = Number(box.dataset.chunk);
+        var files = {};
+        var timer = null;
+        function load(name) {
+            if (!files[name]) {
+                files[name] = fetch(root + name).then(function (r) {
+                    return r.ok ? r.json() : {};
+                });
+            }
+            return files[name];
+        }
+        function tokens(text) {
+            text = text.replace(/[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]/g, '')
+                .replace(/([\u05D0-\u05EA])["'\u05F3\u05F4](?=[\u05D0-\u05EA])/g, '$1')
+                .toLowerCase()
+                .replace(/[ךםןףץ]/g, function (c) { return 'כמנפצ'['ךםןףץ'.indexOf(c)]; });
+            return (text.match(/[\p{L}\p{N}_]+/gu) || []).filter(function (t) {
+                return Array.from(t).length >= prefix;
+            });
+        }
+        function matches(token) {
+            var key = Array.from(token).slice(0, prefix).map(function (c) {
+                return c.codePointAt(0).toString(16);
+            }).join('-');
+            return load(key + '.json').then(function (shard) {
+                var ids = new Set();
+                Object.keys(shard).forEach(function (term) {
+                    if (term.startsWith(token)) {
+                        var id = 0;
+                        shard[term].forEach(function (delta) {
+                            id += delta;
+                            ids.add(id);
+                        });
+                    }
+                });
+                return ids;
+            });
+        }
+        function search(query) {
+            var terms = tokens(query);
+            if (!terms.length) {
+                results.innerHTML = '';
+                return;
+            }
+            Promise.all(terms.map(matches)).then(function (sets) {
+                var ids = Array.from(sets[0]).filter(function (id) {
+                    return sets.every(function (set) { return set.has(id); });
+                }).sort(function (a, b) { return a - b; }).slice(0, 50);
+                var chunks = Array.from(new Set(ids.map(function (id) { return Math.floor(id / chunk); })));
+                return Promise.all(chunks.map(function (c) { return load('docs-' + c + '.json'); })).then(function (loaded) {
+                    if (input.value !== query) {
+                        return;
+                    }
+                    var docs = {};
+                    chunks.forEach(function (c, i) { docs[c] = loaded[i]; });
+                    results.innerHTML = '';
+                    var count = document.createElement('div');
+                    count.className = 'test-meta';
+                    count.textContent = ids.length ? 'נמצאו ' + ids.length + (ids.length === 50 ? '+' : '') + ' תוצאות' : 'לא נמצאו תוצאות';
+                    results.appendChild(count);
+                    ids.forEach(function (id) {
+                        var doc = docs[Math.floor(id / chunk)][id % chunk];
+                        var item = document.createElement('a');
+                        item.className = 'test-item';
+                        item.href = doc[0] + '.html';
+                        item.textContent = doc[1];
+                        results.appendChild(item);
+                    });
+                });
+            });
+        }
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(function () { search(input.value); }, 150);
+        });
+    });
+    </script>
+    '''
+
+
+def index_page_name(page: int) -> str:
+    """Return the file name of an index page (1-based)."""
+    return "index.html" if page == 1 else f"index-{page}.html"
+
+
+def index_row(test: TestRecord) -> list:
+    """Return the compact index.json row for a test summary."""
+    activity_details = test.details
+    activity_type = activity_details.get('activity_type', '')
+    age_group = activity_details.get('age_group', '')
+    return [
+        test.filename,
+        test.display_name,
+        test.status == 'PASS',
+        ACTIVITY_TYPES_HEB.get(activity_type, activity_type),
+        AGE_GROUPS_HEB.get(age_group, age_group),
+        activity_details.get('duration_minutes', 0),
+        round(test.total_duration, 1)
+    ]
+
 
+def generate_pagination_html(page: int, page_count: int) -> str:
+    """Generate the navigation bar of a paginated index."""
+    links = []
+    if page > 1:
+        links.append(f'<a href="{index_page_name(1)}">ראשון</a>')
+        links.append(f'<a href="{index_page_name(page - 1)}">הקודם</a>')
+    links.append(f'<span class="current">עמוד {page} מתוך {page_count}</span>')
+    if page < page_count:
+        links.append(f'<a href="{index_page_name(page + 1)}">הבא</a>')
+        links.append(f'<a href="{index_page_name(page_count)}">אחרון</a>')
+        links.append('<button type="button" class="load-more">טען עוד</button>')
+    return f'''
+            <nav class="pagination" data-index="index.json" data-page="{page}">
+                {' '.join(links)}
+            </nav>'''
 
-def generate_index_html(tests: list) -> str:
-    """Generate the main index page."""
-    # Calculate stats
+
+def generate_stats_html(tests: list) -> str:
+    """Generate the summary stat cards for a list of tests."""
     total = len(tests)
-    passed = sum(1 for t in tests if t.get('status') == 'PASS')
+    passed = sum(1 for t in tests if t.status == 'PASS')
     failed = total - passed
-    total_time = sum(t.get('total_duration', 0) for t in tests)
+    total_time = sum(t.total_duration for t in tests)
     
-    stats_html = f'''
+    return f'''
     <div class="stats-grid">
         <div class="stat-card">
             <div class="stat-value">{total}</div>
@@ -470,79 +1103,549 @@ def generate_index_html(tests: list) -> str:
         </div>
     </div>
     '''
+
+
+class QuantileSketch:
+    """Streaming quantile estimate with bounded relative error (a DDSketch-style log histogram).
+
+    Values are counted in logarithmic buckets whose bounds grow by a factor
+    of (1 + a) / (1 - a), so any quantile is within a relative accuracy a of
+    the true value, while memory grows with the logarithm of the values'
+    range rather than with their number.
+    """
+    
+    __slots__ = ('gamma', 'log_gamma', 'buckets', 'zeros', 'count', 'total', 'max')
+    
+    def __init__(self, accuracy: float = 0.01):
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+    
+    def add(self, value: float):
+        """Count one value."""
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if value <= 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+    
+    @property
+    def mean(self) -> float:
+        """Exact mean of the counted values."""
+        return self.total / self.count if self.count else 0.0
+    
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0-1)."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(key-1), gamma^key]
+                return min(self.max, 2 * self.gamma ** key / (self.gamma + 1))
+        return self.max
+
+
+def step_breakdown(tests: list) -> list:
+    """Sketch step durations per step name in one pass, busiest step first."""
+    sketches = {}
+    for test in tests:
+        for step in test.steps:
+            sketch = sketches.get(step.name)
+            if sketch is None:
+                sketch = sketches[step.name] = QuantileSketch()
+            sketch.add(step.duration)
+    return sorted(sketches.items(), key=lambda item: -item[1].total)
+
+
+def generate_step_breakdown_html(tests: list) -> str:
+    """Generate the per-step duration card of the index page ('' if no test has steps)."""
+    breakdown = step_breakdown(tests)
+    if not breakdown:
+        return ''
+    total_time = sum(sketch.total for _, sketch in breakdown) or 1
+    rows = ''.join(f'''
+                <tr>
+                    <td>{name}</td>
+                    <td>{sketch.count}</td>
+                    <td>{sketch.mean:.1f}</td>
+                    <td>{sketch.quantile(0.5):.1f}</td>
+                    <td>{sketch.quantile(0.95):.1f}</td>
+                    <td>{sketch.max:.1f}</td>
+                    <td>{sketch.total / total_time * 100:.1f}%</td>
+                </tr>''' for name, sketch in breakdown)
+    return f'''
+        <div class="card">
+            <h2>⏱️ זמן לפי שלב (שניות)</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>שלב</th>
+                        <th>מספר הרצות</th>
+                        <th>ממוצע</th>
+                        <th>p50</th>
+                        <th>p95</th>
+                        <th>מקסימום</th>
+                        <th>חלק מהזמן</th>
+                    </tr>
+                </thead>
+                <tbody>{rows}
+                </tbody>
+            </table>
+        </div>
+        '''
+
+
+def generate_index_html(tests: list, date: str = None, css_href: str = None,
+                        page: int = 1, page_size: int = 0, search: bool = False,
+                        dashboard: bool = False, trends: bool = False) -> str:
+    """Generate the main index page.
+
+    With a page_size the summary stats still cover every test, but only the
+    tests of the given (1-based) page are listed. With dashboard set the page
+    is one batch of a multi-batch site and links back to the dashboard; with
+    trends set (single-batch sites only) it links to trends.html.
+    """
+    return PAGE.render(**index_page_slots(tests, date, css_href, page, page_size, search, dashboard,
+                                          trends=trends))
+
+
+def index_page_slots(tests: list, date: str = None, css_href: str = None,
+                     page: int = 1, page_size: int = 0, search: bool = False,
+                     dashboard: bool = False, stats_html: str = None, breakdown_html: str = None,
+                     trends: bool = False) -> dict:
+    """Build the template slots of an index page (see generate_index_html).
+
+    stats_html and breakdown_html, which cover every test, can be passed in
+    when writing several pages so they are only computed once.
+    """
+    total = len(tests)
+    if stats_html is None:
+        stats_html = generate_stats_html(tests)
+    if breakdown_html is None:
+        breakdown_html = generate_step_breakdown_html(tests)
+    if dashboard:
+        breadcrumb = '''
+        <div class="breadcrumb">
+            <a href="../index.html">← חזרה לכל ההרצות</a>
+        </div>
+        '''
+    elif trends:
+        breadcrumb = '''
+        <div class="breadcrumb">
+            <a href="trends.html">📈 מגמות זמני שלבים</a>
+        </div>
+        '''
+    else:
+        breadcrumb = ''
+    
+    content = [f'''
+    <header>
+        <div class="container">
+            <h1>🕎 דוחות בדיקות Agadah-Bot</h1>
+            <p>בדיקות קצה-לקצה ליצירת פעילויות חינוכיות | Claude Opus 4.5</p>
+        </div>
+    </header>
+    <div class="container">{breadcrumb}
+        <div class="card">
+            <h2>📊 סיכום כללי</h2>
+            {stats_html}
+        </div>
+        {breakdown_html}
+        <div class="card">
+            <h2>📋 רשימת בדיקות</h2>
+            ''']
+    if search:
+        content.append(SEARCH_BOX)
     
     # Generate test list
-    tests_html = '<div class="test-list">'
+    page_count = 1
+    if page_size:
+        page_count = max(1, math.ceil(total / page_size))
+        tests = tests[(page - 1) * page_size:page * page_size]
+    content.append('<div class="test-list">')
     for test in tests:
-        status_class = 'pass' if test.get('status') == 'PASS' else 'fail'
-        status_icon = '✓' if test.get('status') == 'PASS' else '✗'
+        status_class = 'pass' if test.status == 'PASS' else 'fail'
+        status_icon = '✓' if test.status == 'PASS' else '✗'
         
-        activity_type = test.get('activity_details', {}).get('activity_type', '')
+        activity_type = test.details.get('activity_type', '')
         activity_type_heb = ACTIVITY_TYPES_HEB.get(activity_type, activity_type)
         
-        age_group = test.get('activity_details', {}).get('age_group', '')
+        age_group = test.details.get('age_group', '')
         age_group_heb = AGE_GROUPS_HEB.get(age_group, age_group)
         
-        duration_min = test.get('activity_details', {}).get('duration_minutes', 0)
+        duration_min = test.details.get('duration_minutes', 0)
         
-        tests_html += f'''
-        <a href="{test['filename']}.html" class="test-item">
+        content.append(f'''
+        <a href="{test.filename}.html" class="test-item">
             <div class="test-status {status_class}">{status_icon}</div>
             <div class="test-info">
-                <div class="test-name">{test.get('name_heb', test.get('name', 'Unknown'))}</div>
+                <div class="test-name">{test.display_name}</div>
                 <div class="test-meta">
                     <span class="badge badge-primary">{activity_type_heb}</span>
                     <span class="badge badge-primary">{age_group_heb}</span>
                     <span class="badge badge-primary">{duration_min} דקות</span>
                 </div>
             </div>
-            <div class="test-duration">{test.get('total_duration', 0)/60:.1f} דק'</div>
+            <div class="test-duration">{test.total_duration/60:.1f} דק'</div>
         </a>
-        '''
-    tests_html += '</div>'
+        ''')
+    content.append('</div>')
+    if page_count > 1:
+        content.append(generate_pagination_html(page, page_count))
+    content.append('''
+        </div>
+    </div>
+    ''')
+    if page_count > 1:
+        content.append(INDEX_SCRIPT)
+    if search:
+        content.append(SEARCH_SCRIPT)
     
-    content = f'''
+    return dict(
+        title="דוחות בדיקות Agadah-Bot",
+        content=content,
+        date=date or build_date(),
+        style=style_tag(css_href)
+    )
+
+
+def generate_dashboard_html(batches: list, date: str = None, css_href: str = None) -> str:
+    """Generate the top-level page of a multi-batch site.
+
+    batches is a list of (name, tests) pairs; each batch's own index lives
+    in the <name>/ subfolder.
+    """
+    content = [f'''
     <header>
         <div class="container">
             <h1>🕎 דוחות בדיקות Agadah-Bot</h1>
-            <p>בדיקות קצה-לקצה ליצירת פעילויות חינוכיות | Claude Opus 4.5</p>
+            <p>כל הרצות הבדיקות | {len(batches)} הרצות</p>
         </div>
     </header>
     <div class="container">
+        <div class="breadcrumb">
+            <a href="trends.html">📈 מגמות זמני שלבים</a>
+        </div>
+        
         <div class="card">
             <h2>📊 סיכום כללי</h2>
-            {stats_html}
+            {generate_stats_html([test for _, tests in batches for test in tests])}
         </div>
         
         <div class="card">
-            <h2>📋 רשימת בדיקות</h2>
-            {tests_html}
+            <h2>🗂️ הרצות</h2>
+            <div class="test-list">''']
+    for name, tests in sorted(batches, key=lambda batch: batch[0], reverse=True):
+        total = len(tests)
+        passed = sum(1 for t in tests if t.status == 'PASS')
+        status_class = 'pass' if passed == total else 'fail'
+        rate = f"{passed / total * 100:.0f}%" if total else '-'
+        content.append(f'''
+        <a href="{name}/index.html" class="test-item">
+            <div class="test-status {status_class}" style="font-size: 0.8rem; font-weight: 600">{rate}</div>
+            <div class="test-info">
+                <div class="test-name">{name}</div>
+                <div class="test-meta">
+                    <span class="badge badge-primary">{total} בדיקות</span>
+                    <span class="badge badge-success">{passed} עברו</span>
+                    <span class="badge badge-danger">{total - passed} נכשלו</span>
+                </div>
+            </div>
+            <div class="test-duration">{sum(t.total_duration for t in tests)/60:.1f} דק'</div>
+        </a>
+        ''')
+    content.append('''
+            </div>
         </div>
     </div>
-    '''
+    ''')
     
-    return HTML_TEMPLATE.format(
+    return PAGE.render(
         title="דוחות בדיקות Agadah-Bot",
         content=content,
-        date=datetime.now().strftime("%d/%m/%Y")
+        date=date or build_date(),
+        style=style_tag(css_href)
+    )
+
+
+# A step regresses when its median in the latest batch exceeds the median of
+# its medians over the previous REGRESSION_WINDOW batches by this fraction
+REGRESSION_WINDOW = 10
+REGRESSION_THRESHOLD = 0.2
+
+# Trend charts plot at most this many of the latest batches
+TREND_CHART_BATCHES = 200
+
+
+def percentile(sorted_values, p: float) -> float:
+    """Nearest-rank percentile (0-100) of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def collect_step_durations(rows) -> dict:
+    """Group (batch, step, duration) rows into {step: {batch: array('d') of durations}}.
+
+    Durations are kept as packed C doubles rather than float objects, so a few
+    million step rows take tens of megabytes, not hundreds.
+    """
+    durations = {}
+    for batch, step, duration in rows:
+        by_batch = durations.get(step)
+        if by_batch is None:
+            by_batch = durations[step] = {}
+        values = by_batch.get(batch)
+        if values is None:
+            values = by_batch[batch] = array('d')
+        values.append(duration)
+    return durations
+
+
+def step_trends(durations: dict) -> list:
+    """Summarize collect_step_durations() output per step, slowest median first.
+
+    Each entry holds the step's overall count, mean and p50/p90/p99, its
+    per-batch p50/p90 series in batch name (i.e. chronological) order, and the
+    latest batch's p50 change against the preceding batches' median.
+    """
+    trends = []
+    for step, by_batch in durations.items():
+        series = []
+        all_values = array('d')
+        for batch in sorted(by_batch):
+            values = sorted(by_batch[batch])
+            series.append((batch, percentile(values, 50), percentile(values, 90)))
+            all_values.extend(by_batch[batch])
+        all_values = sorted(all_values)
+        
+        change = None
+        baseline = sorted(p50 for _, p50, _ in series[-REGRESSION_WINDOW - 1:-1])
+        if baseline:
+            base_p50 = baseline[(len(baseline) - 1) // 2]
+            if base_p50 > 0:
+                change = series[-1][1] / base_p50 - 1
+        trends.append({
+            'step': step,
+            'count': len(all_values),
+            'mean': math.fsum(all_values) / len(all_values),
+            'p50': percentile(all_values, 50),
+            'p90': percentile(all_values, 90),
+            'p99': percentile(all_values, 99),
+            'series': series,
+            'change': change
+        })
+    trends.sort(key=lambda trend: -trend['p50'])
+    return trends
+
+
+def trend_chart_svg(series: list, width: int = 640, height: int = 140) -> str:
+    """Inline SVG line chart of a step's per-batch p50 (solid) and p90 (dashed)."""
+    series = series[-TREND_CHART_BATCHES:]
+    pad = 24
+    top = max(p90 for _, _, p90 in series) or 1
+    step_x = (width - 2 * pad) / max(1, len(series) - 1)
+    
+    def x(i):
+        return f"{pad + i * step_x:.1f}"
+    
+    def y(value):
+        return f"{height - pad - value / top * (height - 2 * pad):.1f}"
+    
+    p50_line = ' '.join(f"{x(i)},{y(p50)}" for i, (_, p50, _) in enumerate(series))
+    p90_line = ' '.join(f"{x(i)},{y(p90)}" for i, (_, _, p90) in enumerate(series))
+    dots = ''.join(
+        f'<circle cx="{x(i)}" cy="{y(p50)}" r="3" style="fill: var(--primary)">'
+        f'<title>{batch}: p50 {p50:.1f}s, p90 {p90:.1f}s</title></circle>'
+        for i, (batch, p50, p90) in enumerate(series))
+    return f'''<svg viewBox="0 0 {width} {height}" width="100%" style="direction: ltr; max-width: {width}px">
+                <text x="{pad}" y="{pad - 8}" font-size="11" style="fill: var(--text-muted)">{top:.0f}s</text>
+                <line x1="{pad}" y1="{height - pad}" x2="{width - pad}" y2="{height - pad}" style="stroke: var(--border)"/>
+                <polyline points="{p90_line}" fill="none" stroke-dasharray="4 3" style="stroke: var(--danger)"/>
+                <polyline points="{p50_line}" fill="none" stroke-width="2" style="stroke: var(--primary)"/>
+                {dots}
+                <text x="{pad}" y="{height - 6}" font-size="11" style="fill: var(--text-muted)">{series[0][0]}</text>
+                <text x="{width - pad}" y="{height - 6}" font-size="11" text-anchor="end" style="fill: var(--text-muted)">{series[-1][0]}</text>
+            </svg>'''
+
+
+def generate_trends_html(trends: list, date: str = None, css_href: str = None,
+                         back_label: str = "← חזרה לכל ההרצות") -> str:
+    """Generate the cross-batch step latency trends page, linking back to index.html."""
+    rows = []
+    for trend in trends:
+        change = trend['change']
+        if change is None:
+            change_html = '<span class="badge badge-primary">-</span>'
+        else:
+            badge = ('badge-danger' if change > REGRESSION_THRESHOLD
+                     else 'badge-success' if change < -REGRESSION_THRESHOLD else 'badge-primary')
+            change_html = f'<span class="badge {badge}">{change * 100:+.0f}%</span>'
+        rows.append(f'''
+                <tr>
+                    <td>{trend['step']}</td>
+                    <td>{trend['count']}</td>
+                    <td>{trend['mean']:.1f}</td>
+                    <td>{trend['p50']:.1f}</td>
+                    <td>{trend['p90']:.1f}</td>
+                    <td>{trend['p99']:.1f}</td>
+                    <td>{change_html}</td>
+                </tr>''')
+    
+    content = [f'''
+    <header>
+        <div class="container">
+            <h1>📈 מגמות זמני שלבים</h1>
+            <p>התפלגות משכי השלבים בכל ההרצות</p>
+        </div>
+    </header>
+    <div class="container">
+        <div class="breadcrumb">
+            <a href="index.html">{back_label}</a>
+        </div>
+        
+        <div class="card">
+            <h2>⏱️ משכי שלבים (שניות)</h2>
+            <table>
+                <thead>
+                    <tr>
+                        <th>שלב</th>
+                        <th>מספר הרצות</th>
+                        <th>ממוצע</th>
+                        <th>p50</th>
+                        <th>p90</th>
+                        <th>p99</th>
+                        <th>שינוי בהרצה האחרונה</th>
+                    </tr>
+                </thead>
+                <tbody>{''.join(rows)}
+                </tbody>
+            </table>
+        </div>
+        ''']
+    for trend in trends:
+        content.append(f'''
+        <div class="card">
+            <h2>{trend['step']}</h2>
+            {trend_chart_svg(trend['series'])}
+        </div>
+        ''')
+    content.append('''
+    </div>
+    ''')
+    
+    return PAGE.render(
+        title="מגמות זמני שלבים",
+        content=content,
+        date=date or build_date(),
+        style=style_tag(css_href)
     )
 
 
-def generate_test_html(test: dict, md_content: str) -> str:
+_markdown = None
+
+
+def convert_markdown(text: str) -> str:
+    """Convert markdown to HTML with a reused, preconfigured Markdown instance.
+
+    Building a Markdown object loads and registers every extension, so each
+    process keeps one and resets it between documents. The import happens
+    here so commands that don't render pages start without it.
+    """
+    global _markdown
+    if _markdown is None:
+        import markdown
+        _markdown = markdown.Markdown(extensions=MARKDOWN_EXTENSIONS)
+    return _markdown.reset().convert(text)
+
+
+def markdown_cache_key(text: str) -> str:
+    """Hash the markdown text together with everything that affects its conversion."""
+    import markdown
+    h = hashlib.sha256()
+    h.update(f"{markdown.__version__}\0{','.join(MARKDOWN_EXTENSIONS)}\0".encode('utf-8'))
+    h.update(text.encode('utf-8'))
+    return h.hexdigest()
+
+
+def cached_convert_markdown(text: str, cache_dir: Path = None) -> str:
+    """convert_markdown() through the on-disk cache in cache_dir, if given.
+
+    Reruns and retries often produce identical final outputs, so their HTML
+    is read back instead of converted again. Hits refresh the entry's mtime
+    so prune_markdown_cache() keeps it.
+    """
+    if cache_dir is None:
+        return convert_markdown(text)
+    cache_file = cache_dir / f"{markdown_cache_key(text)}.html"
+    try:
+        html = cache_file.read_text(encoding='utf-8')
+        os.utime(cache_file)
+        return html
+    except FileNotFoundError:
+        pass
+    html = convert_markdown(text)
+    cache_dir.mkdir(exist_ok=True)
+    write_atomic(cache_file, html.encode('utf-8'))
+    return html
+
+
+def prune_markdown_cache(cache_dir: Path, max_age_days: int = MARKDOWN_CACHE_MAX_AGE_DAYS):
+    """Remove cache entries that have not been used for max_age_days."""
+    if not cache_dir.is_dir():
+        return
+    cutoff = datetime.now().timestamp() - max_age_days * 86400
+    for cache_file in cache_dir.iterdir():
+        if cache_file.stat().st_mtime < cutoff:
+            cache_file.unlink()
+
+
+def generate_test_html(test: TestRecord, md_content: str = None, date: str = None,
+                       css_href: str = None) -> str:
     """Generate individual test report page."""
+    return PAGE.render(**test_page_slots(test, date, css_href))
+
+
+def final_output_to_html(final_output: str, md_cache: Path = None) -> str:
+    """Convert a test's final output to HTML, with placeholders for missing or broken markdown."""
+    if not final_output:
+        return '<p>לא נמצא פלט סופי</p>'
+    try:
+        return cached_convert_markdown(final_output, md_cache)
+    except:
+        return f'<pre>{final_output}</pre>'
+
+
+def test_page_slots(test: TestRecord, date: str = None, css_href: str = None,
+                    md_cache: Path = None, final_output_html: str = None) -> dict:
+    """Build the template slots of a test page (see generate_test_html).
+
+    The converted final output is one slot chunk, so writing the slots out
+    with PageTemplate.write never joins it with the rest of the page.
+    md_cache is the markdown cache directory, if any; final_output_html, if
+    given, is used instead of converting the final output here.
+    """
     
     # Convert markdown final output to HTML
-    final_output = test.get('final_output', '')
-    if final_output:
-        try:
-            final_output_html = markdown.markdown(final_output, extensions=['tables', 'fenced_code'])
-        except:
-            final_output_html = f'<pre>{final_output}</pre>'
-    else:
-        final_output_html = '<p>לא נמצא פלט סופי</p>'
+    if final_output_html is None:
+        final_output_html = final_output_to_html(test.final_output, md_cache)
     
     # Build steps table
-    steps_html = '''
+    steps_html = ['''
     <table>
         <thead>
             <tr>
@@ -552,29 +1655,29 @@ def generate_test_html(test: dict, md_content: str) -> str:
             </tr>
         </thead>
         <tbody>
-    '''
-    for step in test.get('steps', []):
-        status_badge = 'badge-success' if step['status'] == 'SUCCESS' else 'badge-danger'
-        status_text = 'הצלחה' if step['status'] == 'SUCCESS' else 'כשלון'
-        steps_html += f'''
+    ''']
+    for step in test.steps:
+        status_badge = 'badge-success' if step.status == 'SUCCESS' else 'badge-danger'
+        status_text = 'הצלחה' if step.status == 'SUCCESS' else 'כשלון'
+        steps_html.append(f'''
             <tr>
-                <td>{step['name']}</td>
-                <td>{step['duration']:.1f}</td>
+                <td>{step.name}</td>
+                <td>{step.duration:.1f}</td>
                 <td><span class="badge {status_badge}">{status_text}</span></td>
             </tr>
-        '''
-    steps_html += '</tbody></table>'
+        ''')
+    steps_html.append('</tbody></table>')
     
     # Activity details
-    activity_details = test.get('activity_details', {})
+    activity_details = test.details
     activity_type_heb = ACTIVITY_TYPES_HEB.get(activity_details.get('activity_type', ''), '')
     age_group_heb = AGE_GROUPS_HEB.get(activity_details.get('age_group', ''), '')
     
-    content = f'''
+    content = [f'''
     <header>
         <div class="container">
-            <h1>{test.get('name_heb', test.get('name', 'Unknown'))}</h1>
-            <p>{test.get('user_request', '')}</p>
+            <h1>{test.display_name}</h1>
+            <p>{test.user_request or ''}</p>
         </div>
     </header>
     <div class="container">
@@ -596,66 +1699,1569 @@ def generate_test_html(test: dict, md_content: str) -> str:
         
         <div class="card">
             <h2>⏱️ שלבי הביצוע</h2>
-            {steps_html}
+            ''']
+    content.extend(steps_html)
+    content.append(f'''
             <p style="margin-top: 1rem; color: var(--text-muted);">
-                <strong>סה"כ זמן ביצוע:</strong> {test.get('total_duration', 0)/60:.1f} דקות
+                <strong>סה"כ זמן ביצוע:</strong> {test.total_duration/60:.1f} דקות
             </p>
         </div>
         
         <div class="card">
             <h2>📄 תוכנית הפעילות</h2>
             <div class="activity-content">
-                {final_output_html}
+                ''')
+    content.append(final_output_html)
+    content.append('''
             </div>
         </div>
     </div>
-    '''
+    ''')
     
-    return HTML_TEMPLATE.format(
-        title=test.get('name_heb', test.get('name', 'Unknown')),
+    return dict(
+        title=test.display_name,
         content=content,
-        date=datetime.now().strftime("%d/%m/%Y")
+        date=date or build_date(),
+        style=style_tag(css_href)
     )
 
 
-def main():
-    """Main function to generate all HTML reports."""
+def build_date() -> str:
+    """Return the date stamp shown in page footers."""
+    return datetime.now().strftime("%d/%m/%Y")
+
+
+def style_tag(css_href: str = None) -> str:
+    """Return the <head> markup that styles a page."""
+    if css_href:
+        return f'<link rel="stylesheet" href="{css_href}">'
+    return INLINE_STYLE
+
+
+def temp_path(path: Path) -> Path:
+    """Return the hidden, per-process temp file name used to write path atomically."""
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def write_atomic(path: Path, data: bytes):
+    """Write data to path via a temp file and os.replace().
+
+    Readers (e.g. the web server while cron runs a build) see either the old
+    file or the complete new one, never a truncated page.
+    """
+    tmp = temp_path(path)
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+
+
+class OutputStream:
+    """Buffered UTF-8 text writer for a generated file and its .gz sibling.
+
+    Text is encoded in slices of at most WRITE_CHUNK characters, so writing a
+    huge string never holds a second full-size encoded copy. Both files are
+    written to temp files that replace the real ones only when the stream is
+    closed without an error. Like write_output(), it removes a stale .gz
+    sibling when not precompressing.
+    """
+    
+    WRITE_CHUNK = 1 << 16
+    
+    def __init__(self, path: Path, precompress: bool = False):
+        self.bytes_written = 0     # page and .gz bytes, complete once closed
+        self._path = path
+        self._gz_path = path.with_name(path.name + '.gz')
+        self._file = open(temp_path(path), 'wb', buffering=self.WRITE_CHUNK)
+        self._gz_file = self._gz = None
+        if precompress:
+            self._gz_file = open(temp_path(self._gz_path), 'wb', buffering=self.WRITE_CHUNK)
+            self._gz = gzip.GzipFile(filename='', mode='wb', compresslevel=9, mtime=0,
+                                     fileobj=self._gz_file)
+    
+    def write(self, text: str):
+        """Encode and write text."""
+        for start in range(0, len(text), self.WRITE_CHUNK):
+            data = text[start:start + self.WRITE_CHUNK].encode('utf-8')
+            self.bytes_written += len(data)
+            self._file.write(data)
+            if self._gz is not None:
+                self._gz.write(data)
+    
+    def _close_files(self):
+        self._file.close()
+        if self._gz is not None:
+            self._gz.close()
+            self.bytes_written += self._gz_file.tell()
+            self._gz_file.close()
+    
+    def close(self):
+        """Flush the temp files and move them into place."""
+        self._close_files()
+        os.replace(self._file.name, self._path)
+        if self._gz is not None:
+            os.replace(self._gz_file.name, self._gz_path)
+        else:
+            self._gz_path.unlink(missing_ok=True)
+    
+    def abort(self):
+        """Discard everything written, leaving the existing files untouched."""
+        self._close_files()
+        for tmp in (self._file, self._gz_file):
+            if tmp is not None:
+                Path(tmp.name).unlink(missing_ok=True)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_output(path: Path, data: bytes, precompress: bool = False, compressed: bytes = None):
+    """Write a generated file, keeping its .gz sibling in step with it.
+
+    With precompress the sibling is written at maximum compression (and with
+    a zero mtime, so identical pages give identical .gz files); without it any
+    old sibling is removed so a web server never serves stale content.
+    compressed, if given, is data already gzipped that way (e.g. by a worker).
+    """
+    write_atomic(path, data)
+    gz_path = path.with_name(path.name + '.gz')
+    if compressed is not None:
+        write_atomic(gz_path, compressed)
+    elif precompress:
+        write_atomic(gz_path, gzip.compress(data, compresslevel=9, mtime=0))
+    else:
+        gz_path.unlink(missing_ok=True)
+
+
+def ensure_precompressed(path: Path):
+    """Create path's .gz sibling if it is missing or older than path."""
+    gz_path = path.with_name(path.name + '.gz')
+    try:
+        if gz_path.stat().st_mtime_ns >= path.stat().st_mtime_ns:
+            return
+    except FileNotFoundError:
+        pass
+    write_atomic(gz_path, gzip.compress(path.read_bytes(), compresslevel=9, mtime=0))
+
+
+def write_stylesheet(output_dir: Path, precompress: bool = False) -> str:
+    """Write the shared stylesheet under a content-hashed name and return that name.
+
+    The hash in the file name lets the web server mark it immutable, since any
+    change to the CSS produces a new file (and new links in every page).
+    """
+    css = textwrap.dedent(STYLESHEET).encode('utf-8')
+    name = f"report.{hashlib.sha256(css).hexdigest()[:12]}.css"
+    css_file = output_dir / name
+    if not css_file.exists():
+        write_output(css_file, css, precompress)
+    elif precompress:
+        ensure_precompressed(css_file)
+    return name
+
+
+def site_stylesheet(output_dir: Path, args: argparse.Namespace, dashboard: bool = False) -> str:
+    """Return the stylesheet link for a site's pages, or None to inline the styles.
+
+    The batch subsites of a dashboard link the root's stylesheet, so the same
+    file has one URL (and one cached copy) across every batch.
+    """
+    if not args.external_css:
+        return None
+    if dashboard:
+        return "../" + write_stylesheet(output_dir.parent, args.gzip)
+    return write_stylesheet(output_dir, args.gzip)
+
+
+def generator_fingerprint(css_href: str = None, policy: StatusPolicy = DEFAULT_STATUS_POLICY) -> str:
+    """Hash everything besides the source markdown that affects page output or summaries."""
+    h = hashlib.sha256()
+    h.update(str(GENERATOR_VERSION).encode())
+    h.update(policy.key().encode('utf-8'))
+    h.update(HTML_TEMPLATE.encode('utf-8'))
+    h.update(style_tag(css_href).encode('utf-8'))
+    for table in (TEST_NAMES_HEB, ACTIVITY_TYPES_HEB, AGE_GROUPS_HEB):
+        h.update(json.dumps(table, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return h.hexdigest()
+
+
+def file_digest(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_manifest(output_dir: Path, fingerprint: str = None) -> dict:
+    """Load the build manifest, returning an empty one if missing or stale.
+
+    Without a fingerprint only the generator version has to match, which is
+    enough for commands that reuse the cached summaries but render no pages.
+    """
+    empty = {'version': GENERATOR_VERSION, 'generator': fingerprint, 'tests': {}}
+    try:
+        manifest = json.loads((output_dir / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return empty
+    if manifest.get('version') != GENERATOR_VERSION or not isinstance(manifest.get('tests'), dict):
+        return empty
+    if fingerprint is not None and manifest.get('generator') != fingerprint:
+        return empty
+    for entry in manifest['tests'].values():
+        entry['summary'] = TestRecord.from_dict(entry['summary'])
+    return manifest
+
+
+def save_manifest(output_dir: Path, manifest: dict):
+    """Write the build manifest."""
+    write_atomic(output_dir / MANIFEST_NAME, json.dumps(
+        manifest, ensure_ascii=False, sort_keys=True, default=TestRecord.to_dict).encode('utf-8'))
+
+
+def cached_summary(test_file: Path, output_dir: Path, manifest: dict, search: bool = False):
+    """Return the cached summary for an unchanged test, or None if it must be rebuilt.
+
+    A matching size and mtime is trusted without reading the file; otherwise
+    the content hash decides. Updates the manifest entry's stat fields so the
+    next run can take the fast path again.
+    """
+    entry = manifest['tests'].get(test_file.stem)
+    if not entry or not (output_dir / f"{test_file.stem}.html").exists():
+        return None
+    if search and 'terms' not in entry:
+        return None
+    st = test_file.stat()
+    if entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+        return entry['summary']
+    if entry.get('size') == st.st_size and entry.get('sha256') == file_digest(test_file):
+        entry['mtime_ns'] = st.st_mtime_ns
+        return entry['summary']
+    return None
+
+
+def parse_test_file(test_file: Path, policy: StatusPolicy = DEFAULT_STATUS_POLICY,
+                    source: bytes = None) -> TestRecord:
+    """Parse a test report file into a record with its filename and status.
+
+    source, if given, is the file's content (bytes or an mmap), already
+    read by the caller.
+    """
+    if source is not None:
+        if len(source) >= MMAP_MIN_SIZE:
+            info = parse_report_buffer(source)
+        else:
+            # newline=None translates line endings the way open() does
+            info = parse_test_report(io.StringIO(source.decode('utf-8'), newline=None))
+    else:
+        with open(test_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= MMAP_MIN_SIZE:
+                # Search a mapping of the file, decoding only the lines the parser needs
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    info = parse_report_buffer(data)
+            else:
+                info = parse_test_report(io.TextIOWrapper(f, encoding='utf-8'))
+    test = TestRecord.from_dict(info)
+    test.filename = test_file.stem
+    test.status = policy.status(test)
+    return test
+
+
+def source_fields(test_file: Path, before: os.stat_result, length: int, digest: str) -> dict:
+    """Return the manifest fields for a report parsed from length bytes hashing to digest.
+
+    before is the file's stat taken before it was read. If the file has
+    changed since (the runner is still writing it), the fields are left
+    empty so that the next build renders the report again.
+    """
+    try:
+        after = test_file.stat()
+    except FileNotFoundError:
+        after = None
+    if (after is None or length != before.st_size
+            or (after.st_size, after.st_mtime_ns) != (before.st_size, before.st_mtime_ns)):
+        return {'sha256': None, 'size': None, 'mtime_ns': None}
+    return {'sha256': digest, 'size': before.st_size, 'mtime_ns': before.st_mtime_ns}
+
+
+def process_test_file(test_file: Path, output_dir: Path, date: str, css_href: str = None,
+                      precompress: bool = False, search: bool = False, md_cache: Path = None,
+                      policy: StatusPolicy = DEFAULT_STATUS_POLICY) -> tuple:
+    """Parse and render a single test report.
+
+    Returns the test's record, without its final output, its search terms
+    (None unless search is set), a metrics dict of per-phase seconds and
+    bytes in/out, and the source_fields() of the bytes that were parsed.
+    Runs inside worker processes when --jobs > 1, so only this small
+    summary is sent back to the parent.
+    """
+    # Read the report once: the bytes parsed are the bytes hashed
+    with open(test_file, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size >= MMAP_MIN_SIZE:
+            source = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            source = f.read()
+    try:
+        test, terms, slots, metrics = prepare_test_page(test_file, date, css_href, search,
+                                                        md_cache, policy, source)
+        length = len(source)
+        fields = source_fields(test_file, st, length, hashlib.sha256(source).hexdigest())
+    finally:
+        if isinstance(source, mmap.mmap):
+            source.close()
+    rendered = time.perf_counter()
+    
+    # Write the test's HTML page, streaming it to disk chunk by chunk
+    with OutputStream(output_dir / f"{test_file.stem}.html", precompress) as out:
+        PAGE.write(out, **slots)
+    metrics['write'] = time.perf_counter() - rendered
+    metrics['bytes_in'] = length
+    metrics['bytes_out'] = out.bytes_written
+    return test, terms, metrics, fields
+
+
+def prepare_test_page(test_file: Path, date: str, css_href: str = None, search: bool = False,
+                      md_cache: Path = None, policy: StatusPolicy = DEFAULT_STATUS_POLICY,
+                      source: bytes = None) -> tuple:
+    """Parse a test report and build its page slots.
+
+    Returns (record, search terms, slots, metrics) with the parse, markdown
+    and render seconds filled in; the record's final output is dropped.
+    """
+    start = time.perf_counter()
+    test = parse_test_file(test_file, policy, source)
+    parsed = time.perf_counter()
+    final_output_html = final_output_to_html(test.final_output, md_cache)
+    converted = time.perf_counter()
+    slots = test_page_slots(test, date=date, css_href=css_href, final_output_html=final_output_html)
+    terms = test_search_terms(test) if search else None
+    test.final_output = final_output_html = None
+    metrics = {
+        'parse': parsed - start,
+        'markdown': converted - parsed,
+        'render': time.perf_counter() - converted
+    }
+    return test, terms, slots, metrics
+
+
+def render_test_source(test_file: Path, source: bytes, date: str, css_href: str = None,
+                       precompress: bool = False, search: bool = False, md_cache: Path = None,
+                       policy: StatusPolicy = DEFAULT_STATUS_POLICY) -> tuple:
+    """CPU stage of the pipelined build: render a report already read into memory.
+
+    Returns (record, search terms, metrics, page bytes, gzipped page or None);
+    writing the page is left to the pipeline's writer stage.
+    """
+    test, terms, slots, metrics = prepare_test_page(test_file, date, css_href, search,
+                                                    md_cache, policy, source)
+    started = time.perf_counter()
+    page = PAGE.render(**slots).encode('utf-8')
+    compressed = gzip.compress(page, compresslevel=9, mtime=0) if precompress else None
+    metrics['render'] += time.perf_counter() - started
+    metrics['bytes_in'] = len(source)
+    metrics['bytes_out'] = len(page) + (len(compressed) if compressed is not None else 0)
+    return test, terms, metrics, page, compressed
+
+
+def read_test_source(test_file: Path) -> tuple:
+    """Reader stage of the pipelined build: return a report's bytes and source_fields().
+
+    Returns (None, None) for reports of MMAP_MIN_SIZE or more, which are left
+    to process_test_file() so they are mapped and streamed, not held in memory.
+    """
+    with open(test_file, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if st.st_size >= MMAP_MIN_SIZE:
+            return None, None
+        source = f.read()
+    return source, source_fields(test_file, st, len(source), hashlib.sha256(source).hexdigest())
+
+
+# Pipelined build (--pipeline): reports in flight between stages, and
+# concurrent reads/writes, enough to hide network file system latency
+PIPELINE_DEPTH = 16
+PIPELINE_READERS = 4
+PIPELINE_WRITERS = 4
+
+
+async def pipeline_tests(test_files: list, jobs: int, executor=None, output_dir: Path = None,
+                         precompress: bool = False, **options) -> list:
+    """Render test pages through a reader -> CPU -> writer pipeline.
+
+    Reads and writes run in threads and parsing/rendering in the executor
+    (a process pool of jobs workers by default), connected by bounded queues,
+    so a slow file system and the CPU work overlap instead of alternating.
+    Only reports below MMAP_MIN_SIZE travel through the queues as bytes;
+    larger ones are rendered by process_test_file() in the executor, which
+    maps the report and streams its page to disk. Returns render_tests()-style (test_file, (record, terms, metrics, fields))
+    pairs in input order.
+    """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    render = partial(render_test_source, precompress=precompress, **options)
+    process = partial(process_test_file, output_dir=output_dir, precompress=precompress, **options)
+    sources = asyncio.Queue(PIPELINE_DEPTH)
+    pages = asyncio.Queue(PIPELINE_DEPTH)
+    pending = iter(enumerate(test_files))
+    results = [None] * len(test_files)
+    
+    async def read():
+        for index, test_file in pending:
+            source, fields = await asyncio.to_thread(read_test_source, test_file)
+            await sources.put((index, test_file, source, fields))
+    
+    async def compute():
+        while (item := await sources.get()) is not None:
+            index, test_file, source, fields = item
+            if source is None:
+                # Large report: mapped, rendered and written by the worker
+                results[index] = (test_file, await loop.run_in_executor(executor, process, test_file))
+                continue
+            test, terms, metrics, page, compressed = await loop.run_in_executor(
+                executor, render, test_file, source)
+            await pages.put((index, test_file, test, terms, metrics, fields, page, compressed))
+    
+    async def write():
+        while (item := await pages.get()) is not None:
+            index, test_file, test, terms, metrics, fields, page, compressed = item
+            started = time.perf_counter()
+            await asyncio.to_thread(write_output, output_dir / f"{test_file.stem}.html",
+                                    page, precompress, compressed)
+            metrics['write'] = time.perf_counter() - started
+            results[index] = (test_file, (test, terms, metrics, fields))
+    
+    async def stage(worker, count: int, downstream: asyncio.Queue = None, consumers: int = 0):
+        await asyncio.gather(*(worker() for _ in range(count)))
+        for _ in range(consumers):
+            await downstream.put(None)
+    
+    # Two tasks per worker keep each one busy while results travel back
+    computers = 2 * jobs
+    own_executor = executor is None
+    if own_executor:
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else ThreadPoolExecutor(max_workers=1)
+    try:
+        await asyncio.gather(stage(read, PIPELINE_READERS, sources, computers),
+                             stage(compute, computers, pages, PIPELINE_WRITERS),
+                             stage(write, PIPELINE_WRITERS))
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+    return results
+
+
+def render_tests(test_files: list, jobs: int, executor=None, pipeline: bool = False, **options):
+    """Render test pages, yielding (test_file, process_test_file() result) pairs in input order.
+
+    Keyword options are passed through to process_test_file. An executor,
+    if given, is used instead of starting a process pool of our own (batches
+    built concurrently share one pool). With pipeline, pages are rendered by
+    pipeline_tests() and yielded once all are written.
+    """
+    if pipeline and test_files:
+        import asyncio
+        yield from asyncio.run(pipeline_tests(test_files, jobs, executor, **options))
+        return
+    process = partial(process_test_file, **options)
+    if executor is not None:
+        results = executor.map(process, test_files,
+                               chunksize=max(1, len(test_files) // (jobs * 4)))
+        yield from zip(test_files, results)
+    elif jobs > 1 and len(test_files) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            results = executor.map(process, test_files,
+                                   chunksize=max(1, len(test_files) // (jobs * 4)))
+            yield from zip(test_files, results)
+    else:
+        for test_file in test_files:
+            yield test_file, process(test_file)
+
+
+def write_index(tests: list, output_dir: Path, date: str, css_href: str = None,
+                page_size: int = 0, precompress: bool = False, search: bool = False,
+                dashboard: bool = False, trends: bool = False):
+    """Write index.html, plus index-N.html pages and index.json when paginated.
+
+    index.html goes last, so it never links to a page (or an index.json entry)
+    that isn't there yet.
+    """
+    page_count = max(1, math.ceil(len(tests) / page_size)) if page_size else 1
+    # The summary cards cover every test, so build them once for all pages
+    stats_html = generate_stats_html(tests)
+    breakdown_html = generate_step_breakdown_html(tests)
+    
+    def write_page(page):
+        slots = index_page_slots(tests, date=date, css_href=css_href,
+                                 page=page, page_size=page_size, search=search,
+                                 dashboard=dashboard, stats_html=stats_html,
+                                 breakdown_html=breakdown_html, trends=trends)
+        with OutputStream(output_dir / index_page_name(page), precompress) as out:
+            PAGE.write(out, **slots)
+    
+    for page in range(page_count, 1, -1):
+        write_page(page)
+    
+    index_json = output_dir / "index.json"
+    if page_size:
+        data = {
+            'page_size': page_size,
+            'pages': page_count,
+            'fields': INDEX_FIELDS,
+            'tests': [index_row(test) for test in tests]
+        }
+        write_output(index_json, json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+                     precompress)
+    else:
+        index_json.unlink(missing_ok=True)
+        index_json.with_name("index.json.gz").unlink(missing_ok=True)
+    
+    write_page(1)
+    
+    # Drop pages left over from a larger batch or page count
+    for old_page in output_dir.glob("index-*.html*"):
+        number = old_page.name[len("index-"):].split('.')[0]
+        if number.isdigit() and not 2 <= int(number) <= page_count:
+            old_page.unlink()
+
+
+HEBREW_POINTS_RE = re.compile('[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4\u05C5\u05C7]')
+GERESH_RE = re.compile('(?<=[\u05D0-\u05EA])["\'\u05F3\u05F4](?=[\u05D0-\u05EA])')
+TOKEN_RE = re.compile(r'\w+')
+FINAL_LETTERS = str.maketrans('ךםןףץ', 'כמנפצ')
+HEBREW_PREFIXES = set('והבכלמש')
+
+
+def search_terms(text: str) -> set:
+    """Tokenize text for the search index.
+
+    Niqqud and cantillation are dropped, geresh/gershayim inside words are
+    removed (צה"ל -> צהל), final letters are folded to their regular forms so
+    prefix queries match, and up to two attached one-letter prefixes
+    (ו, ה, ב, כ, ל, מ, ש) are also indexed stripped, so 'אור' finds 'והאור'.
+    """
+    text = GERESH_RE.sub('', HEBREW_POINTS_RE.sub('', text)).lower().translate(FINAL_LETTERS)
+    terms = set()
+    for token in TOKEN_RE.findall(text):
+        if len(token) < SEARCH_PREFIX:
+            continue
+        terms.add(token)
+        for _ in range(2):
+            if len(token) <= 3 or token[0] not in HEBREW_PREFIXES:
+                break
+            token = token[1:]
+            terms.add(token)
+    return terms
+
+
+def test_search_terms(test: TestRecord) -> str:
+    """Return a test's search terms as one space-separated string."""
+    activity_details = test.details
+    fields = [
+        test.name_heb or '',
+        test.user_request or '',
+        str(activity_details.get('main_topic', '')),
+        ' '.join(map(str, activity_details.get('main_values', []))),
+        test.final_output or ''
+    ]
+    return ' '.join(sorted(search_terms(' '.join(fields))))
+
+
+def write_search_index(tests: list, terms: dict, output_dir: Path, precompress: bool = False):
+    """Write the sharded inverted index under output_dir/search.
+
+    terms maps each test's filename to its test_search_terms() string. Doc ids
+    are positions in `tests`; each posting list is delta-encoded. Shards whose
+    content is unchanged are left untouched.
+    """
+    postings = {}
+    for doc_id, test in enumerate(tests):
+        for term in terms[test.filename].split():
+            postings.setdefault(term, []).append(doc_id)
+    
+    files = {}
+    for term, ids in postings.items():
+        key = '-'.join(f"{ord(c):x}" for c in term[:SEARCH_PREFIX])
+        files.setdefault(f"{key}.json", {})[term] = [ids[0]] + [b - a for a, b in zip(ids, ids[1:])]
+    for start in range(0, len(tests), SEARCH_DOC_CHUNK):
+        files[f"docs-{start // SEARCH_DOC_CHUNK}.json"] = [
+            [test.filename, test.display_name]
+            for test in tests[start:start + SEARCH_DOC_CHUNK]
+        ]
+    
+    search_dir = output_dir / SEARCH_DIR
+    search_dir.mkdir(exist_ok=True)
+    for name, data in files.items():
+        path = search_dir / name
+        encoded = json.dumps(data, ensure_ascii=False, separators=(',', ':'), sort_keys=True).encode('utf-8')
+        try:
+            if path.read_bytes() == encoded:
+                if precompress:
+                    ensure_precompressed(path)
+                continue
+        except FileNotFoundError:
+            pass
+        write_output(path, encoded, precompress)
+    for old_file in search_dir.iterdir():
+        if old_file.name.removesuffix('.gz') not in files:
+            old_file.unlink()
+
+
+RESULTS_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    digest TEXT NOT NULL,
+    updated TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    id INTEGER PRIMARY KEY,
+    batch_id INTEGER NOT NULL REFERENCES batches(id) ON DELETE CASCADE,
+    filename TEXT NOT NULL,
+    name TEXT,
+    model TEXT,
+    status TEXT,
+    user_request TEXT,
+    activity_type TEXT,
+    age_group TEXT,
+    activity_details TEXT,
+    total_duration REAL NOT NULL,
+    UNIQUE (batch_id, filename)
+);
+CREATE TABLE IF NOT EXISTS steps (
+    test_id INTEGER NOT NULL REFERENCES tests(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    status TEXT,
+    duration REAL NOT NULL,
+    PRIMARY KEY (test_id, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tests_name ON tests (name);
+CREATE INDEX IF NOT EXISTS steps_name_duration ON steps (name, duration);
+CREATE VIEW IF NOT EXISTS step_runs AS
+    SELECT batches.name AS batch, tests.filename, tests.name AS test, tests.model,
+           steps.position, steps.name AS step, steps.status, steps.duration
+    FROM steps
+    JOIN tests ON tests.id = steps.test_id
+    JOIN batches ON batches.id = tests.batch_id;
+'''
+
+
+def open_results_db(path: Path):
+    """Open the SQLite results store, creating its tables on first use.
+
+    WAL mode lets readers query the store while a build is writing to it.
+    """
+    import sqlite3
+    db = sqlite3.connect(path)
+    db.execute('PRAGMA journal_mode=WAL')
+    db.execute('PRAGMA foreign_keys=ON')
+    db.executescript(RESULTS_SCHEMA)
+    return db
+
+
+def store_batch(db, batch_name: str, tests: list) -> bool:
+    """Replace a batch's tests and steps in one transaction.
+
+    Returns False, without writing, if the batch's summaries are unchanged
+    since they were last stored.
+    """
+    digest = hashlib.sha256(json.dumps(tests, ensure_ascii=False, sort_keys=True,
+                                       default=TestRecord.to_dict).encode('utf-8')).hexdigest()
+    row = db.execute('SELECT id, digest FROM batches WHERE name = ?', (batch_name,)).fetchone()
+    if row and row[1] == digest:
+        return False
+    
+    updated = datetime.now().isoformat(timespec='seconds')
+    with db:
+        if row:
+            batch_id = row[0]
+            db.execute('DELETE FROM tests WHERE batch_id = ?', (batch_id,))
+            db.execute('UPDATE batches SET digest = ?, updated = ? WHERE id = ?', (digest, updated, batch_id))
+        else:
+            batch_id = db.execute('INSERT INTO batches (name, digest, updated) VALUES (?, ?, ?)',
+                                  (batch_name, digest, updated)).lastrowid
+        db.executemany(
+            'INSERT INTO tests (batch_id, filename, name, model, status, user_request, activity_type, '
+            'age_group, activity_details, total_duration) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(batch_id, test.filename, test.name, test.model, test.status, test.user_request,
+              test.details.get('activity_type'), test.details.get('age_group'),
+              json.dumps(test.activity_details, ensure_ascii=False) if test.activity_details is not None else None,
+              test.total_duration)
+             for test in tests])
+        test_ids = dict(db.execute('SELECT filename, id FROM tests WHERE batch_id = ?', (batch_id,)))
+        db.executemany(
+            'INSERT INTO steps (test_id, position, name, status, duration) VALUES (?, ?, ?, ?, ?)',
+            [(test_ids[test.filename], position, step.name, step.status, step.duration)
+             for test in tests for position, step in enumerate(test.steps)])
+    return True
+
+
+def write_results_db(path: Path, batches: list):
+    """Store each (name, tests) batch in the SQLite results store at path."""
+    db = open_results_db(path)
+    try:
+        stored = sum(store_batch(db, name, tests) for name, tests in batches)
+        if stored:
+            # Refresh the planner statistics (sampled, so this stays cheap as
+            # the store grows); without them per-batch queries scan by step name
+            db.execute('PRAGMA analysis_limit=1000')
+            db.execute('ANALYZE')
+    finally:
+        db.close()
+    print(f"🗄️  Stored {stored} changed batch(es) ({len(batches) - stored} unchanged) in {path}")
+
+
+def write_site_index(tests: list, manifest: dict, output_dir: Path, date: str, css_href: str,
+                     args: argparse.Namespace, dashboard: bool = False, trends: bool = False):
+    """Write the search index and then the index pages, and drop unused stylesheets."""
+    if args.search:
+        terms = {test.filename: manifest['tests'][test.filename]['terms'] for test in tests}
+        write_search_index(tests, terms, output_dir, args.gzip)
+    write_index(tests, output_dir, date, css_href, args.page_size, args.gzip, args.search, dashboard,
+                trends)
+    if not args.search and (output_dir / SEARCH_DIR).is_dir():
+        shutil.rmtree(output_dir / SEARCH_DIR)
+    
+    remove_stale_stylesheets(output_dir, css_href)
+    print("\nCreated index: index.html")
+
+
+def remove_stale_stylesheets(output_dir: Path, css_href: str = None):
+    """Delete report.*.css files other than css_href, once every page links the current one."""
+    for css_file in output_dir.glob("report.*.css*"):
+        if css_file.name not in (css_href, f"{css_href}.gz"):
+            css_file.unlink()
+
+
+def build(args: argparse.Namespace):
+    """Build the site; with --watch, keep rebuilding it as the batch folder changes."""
+    build_once(args)
+    if not args.watch:
+        return
+    print(f"\n👀 Watching {', '.join(map(str, batch_dirs(args.batch)))} for new and changed tests "
+          "(Ctrl+C to stop)")
+    # Re-resolve --batch globs so batch folders created later are picked up
+    resolve = None
+    if args.batch and any(c in pattern for pattern in args.batch for c in '*?['):
+        resolve = partial(find_batch_dirs, args.batch)
+    try:
+        watch_batch(batch_dirs(args.batch), lambda: build_once(args), resolve=resolve)
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+
+
+def build_once(args: argparse.Namespace):
+    """Parse and render every new or changed test, then write the index.
+
+    With --publish the site is built in a fresh directory, seeded with hard
+    links to the currently published build so unchanged tests are still
+    skipped, and made live by atomically repointing the symlink.
+    """
+    if not args.publish:
+        build_all(OUTPUT_DIR, args)
+        return
+    link = Path(args.publish)
+    if link.exists() and not link.is_symlink():
+        sys.exit(f"{link} exists and is not a symlink; move it away before using --publish")
+    staging = stage_site(link)
+    try:
+        build_all(staging, args)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    publish_site(staging, link)
+
+
+# Watch mode: how long the batch folder must stay quiet before a rebuild, how
+# often the polling fallback rescans it, and how often --batch globs are
+# re-resolved to pick up new batch folders
+WATCH_DEBOUNCE = 0.2
+WATCH_POLL_INTERVAL = 0.25
+WATCH_RESCAN_INTERVAL = 2.0
+
+
+def is_test_report(name: str) -> bool:
+    """Whether a batch folder entry is a test report (test_*.md)."""
+    return name.startswith('test_') and name.endswith('.md')
+
+
+class InotifyWatcher:
+    """Wait for test reports in some folders to be written, moved in or removed (Linux inotify).
+
+    Uses libc through ctypes, so it needs no third-party package; raises
+    OSError where inotify is unavailable.
+    """
+    
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    EVENT = struct.Struct('iIII')
+    
+    def __init__(self, folders: list):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._libc = libc
+        self._watches = {}         # watch descriptor -> folder
+        try:
+            for folder in folders:
+                self.add(folder)
+        except OSError:
+            os.close(self._fd)
+            raise
+    
+    def add(self, folder: Path):
+        """Start watching another folder."""
+        import ctypes
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO | self.IN_DELETE
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(folder), mask)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"cannot watch {folder}")
+        self._watches[wd] = folder
+    
+    @property
+    def folders(self) -> list:
+        """The folders still being watched (a deleted folder drops out)."""
+        return list(self._watches.values())
+    
+    def wait(self, timeout: float = None) -> bool:
+        """Block until a test report changes (True) or timeout seconds pass (False)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0, deadline - time.monotonic())
+            if not select.select([self._fd], [], [], remaining)[0]:
+                return False
+            data = os.read(self._fd, 1 << 16)
+            offset = 0
+            changed = False
+            # Look at every event read, so none (e.g. a removed watch) is lost
+            while offset < len(data):
+                wd, mask, _, name_len = self.EVENT.unpack_from(data, offset)
+                offset += self.EVENT.size
+                name = data[offset:offset + name_len].rstrip(b'\0').decode('utf-8', 'replace')
+                offset += name_len
+                if mask & self.IN_IGNORED:
+                    # The folder was deleted (or unmounted)
+                    self._watches.pop(wd, None)
+                    changed = True
+                elif mask & self.IN_Q_OVERFLOW or is_test_report(name):
+                    changed = True
+            if changed:
+                return True
+
+
+class PollingWatcher:
+    """Portable fallback for InotifyWatcher that rescans the folders periodically."""
+    
+    def __init__(self, folders: list, interval: float = WATCH_POLL_INTERVAL):
+        self._folders = list(folders)
+        self._interval = interval
+        self._snapshot = self._scan()
+    
+    def add(self, folder: Path):
+        """Start watching another folder; the reports already in it don't count as changes."""
+        if folder not in self._folders:
+            self._folders.append(folder)
+        self._snapshot = self._scan()
+    
+    @property
+    def folders(self) -> list:
+        """The folders being watched."""
+        return list(self._folders)
+    
+    def _scan(self) -> dict:
+        snapshot = {}
+        for folder in self._folders:
+            try:
+                with os.scandir(folder) as entries:
+                    for entry in entries:
+                        if is_test_report(entry.name):
+                            st = entry.stat()
+                            snapshot[entry.path] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                pass
+        return snapshot
+    
+    def wait(self, timeout: float = None) -> bool:
+        """Block until a test report changes (True) or timeout seconds pass (False)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            time.sleep(self._interval if deadline is None
+                       else max(0, min(self._interval, deadline - time.monotonic())))
+            snapshot = self._scan()
+            if snapshot != self._snapshot:
+                self._snapshot = snapshot
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+
+
+def watch_batch(batch_dirs: list, rebuild, debounce: float = WATCH_DEBOUNCE, resolve=None):
+    """Call rebuild() after each burst of test report changes in batch_dirs; runs until interrupted.
+
+    A burst ends once nothing has changed for `debounce` seconds. A failed
+    rebuild is reported and watching continues. If given, resolve() is
+    called every WATCH_RESCAN_INTERVAL seconds while idle to list the batch
+    folders again; new ones are watched too and trigger a rebuild.
+    """
+    try:
+        watcher = InotifyWatcher(batch_dirs)
+    except (OSError, AttributeError):
+        print("inotify unavailable, polling for changes")
+        watcher = PollingWatcher(batch_dirs)
+    while True:
+        if not watcher.wait(None if resolve is None else WATCH_RESCAN_INTERVAL):
+            new = []
+            for folder in resolve():
+                if folder not in watcher.folders:
+                    try:
+                        watcher.add(folder)
+                    except OSError:
+                        continue   # already gone again
+                    new.append(folder)
+            if not new:
+                continue
+            print(f"👀 Also watching {', '.join(map(str, new))}")
+        while watcher.wait(debounce):
+            pass
+        try:
+            rebuild()
+        except (Exception, SystemExit) as e:
+            # The build reports bad --batch/--publish setups with sys.exit();
+            # those can come and go while watching, so they don't stop it
+            print(f"❌ Rebuild failed: {e}")
+
+
+def stage_site(link: Path) -> Path:
+    """Create a new build directory next to link, seeded from the build it points at."""
+    staging = link.with_name(f"{link.name}-{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    if link.is_dir():
+        shutil.copytree(link.resolve(), staging, copy_function=os.link)
+    else:
+        staging.mkdir(parents=True)
+    return staging
+
+
+def publish_site(staging: Path, link: Path):
+    """Atomically point link at staging and remove the build it replaces."""
+    previous = link.resolve() if link.is_symlink() else None
+    tmp_link = temp_path(link)
+    tmp_link.unlink(missing_ok=True)
+    os.symlink(staging.name, tmp_link)
+    os.replace(tmp_link, link)
+    if previous is not None and previous.is_dir() and previous != staging.resolve():
+        shutil.rmtree(previous)
+    print(f"🔗 Published: {link} -> {staging.name}")
+
+
+def find_batch_dirs(patterns: list) -> list:
+    """Return the existing folders matching --batch folders and globs, in order."""
+    batches = []
+    for pattern in patterns:
+        if any(c in pattern for c in '*?['):
+            matches = sorted(Path(match) for match in glob.glob(pattern))
+        else:
+            matches = [Path(pattern)]
+        batches.extend(match for match in matches if match.is_dir() and match not in batches)
+    return batches
+
+
+def batch_dirs(patterns: list = None) -> list:
+    """Resolve --batch folders and globs, defaulting to BATCH_DIR."""
+    if not patterns:
+        return [BATCH_DIR]
+    batches = find_batch_dirs(patterns)
+    if not batches:
+        sys.exit(f"No batch folders match {' '.join(patterns)}")
+    names = [batch.name for batch in batches]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        sys.exit(f"Batch folder names must be unique: {', '.join(duplicates)}")
+    return batches
+
+
+def build_all(output_dir: Path, args: argparse.Namespace):
+    """Build every batch into output_dir.
+
+    A single batch is built straight into output_dir. Several batches are
+    built concurrently, each into its own output_dir/<batch name>/ site with
+    its own manifest (so unchanged batches are skipped cheaply), sharing one
+    worker pool, and output_dir/index.html becomes a dashboard of them, with
+    a trends.html of step latencies. With --db the summaries are also stored
+    in the SQLite results store, which then feeds the trends page; a single
+    batch then gets a trends.html of every batch in the store too.
+    """
+    batches = batch_dirs(args.batch)
+    md_cache = None if args.no_markdown_cache else output_dir / MARKDOWN_CACHE_NAME
+    if len(batches) == 1:
+        results = [build_site(batches[0], output_dir, args, md_cache=md_cache)]
+    else:
+        jobs = args.jobs or os.cpu_count() or 1
+        output_dir.mkdir(parents=True, exist_ok=True)
+        if args.external_css:
+            # Written once up front: every batch links this copy
+            write_stylesheet(output_dir, args.gzip)
+        executor = None
+        if jobs > 1:
+            from concurrent.futures import ProcessPoolExecutor
+            executor = ProcessPoolExecutor(max_workers=jobs)
+        from concurrent.futures import ThreadPoolExecutor
+        try:
+            with ThreadPoolExecutor(max_workers=min(len(batches), jobs)) as threads:
+                results = list(threads.map(
+                    lambda batch: build_site(batch, output_dir / batch.name, args, executor=executor,
+                                             md_cache=md_cache, dashboard=True),
+                    batches))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    batch_results = [(batch.name, tests) for batch, tests in zip(batches, results)]
+    db = Path(args.db) if args.db else None
+    if db is not None:
+        write_results_db(db, batch_results)
+    if len(batches) > 1:
+        write_dashboard(batch_results, output_dir, args, db)
+    elif db is not None:
+        css_href = write_stylesheet(output_dir, args.gzip) if args.external_css else None
+        write_trends(output_dir, args, css_href, db=db, back_label="← חזרה לרשימת הבדיקות")
+        print("Created trends: trends.html")
+    if md_cache is not None:
+        prune_markdown_cache(md_cache)
+
+
+def write_trends(output_dir: Path, args: argparse.Namespace, css_href: str = None,
+                 batches: list = None, db: Path = None, **page_options):
+    """Write output_dir/trends.html from the results store db, or else from batches.
+
+    Extra keyword options are passed through to generate_trends_html.
+    """
+    if db is not None:
+        results = open_results_db(db)
+        try:
+            durations = collect_step_durations(results.execute('SELECT batch, step, duration FROM step_runs'))
+        finally:
+            results.close()
+    else:
+        durations = collect_step_durations((name, step.name, step.duration)
+                                           for name, tests in batches for test in tests for step in test.steps)
+    write_output(output_dir / "trends.html",
+                 generate_trends_html(step_trends(durations), css_href=css_href, **page_options).encode('utf-8'),
+                 args.gzip)
+
+
+def write_dashboard(batches: list, output_dir: Path, args: argparse.Namespace, db: Path = None):
+    """Write the multi-batch dashboard as output_dir/index.html, plus trends.html.
+
+    The trends cover the given batches, or every batch in the results store
+    db if one is given.
+    """
+    css_href = write_stylesheet(output_dir, args.gzip) if args.external_css else None
+    write_trends(output_dir, args, css_href, batches, db)
+    write_output(output_dir / "index.html",
+                 generate_dashboard_html(batches, css_href=css_href).encode('utf-8'), args.gzip)
+    remove_stale_stylesheets(output_dir, css_href)
+    print(f"\nCreated dashboard: index.html ({len(batches)} batches) + trends.html")
+
+
+def build_site(batch_dir: Path, output_dir: Path, args: argparse.Namespace, executor=None,
+               md_cache: Path = None, dashboard: bool = False) -> list:
+    """Build (or incrementally update) the site for one batch in output_dir.
+
+    Returns the summaries of the batch's tests, in file name order. Phase
+    timings, counts and bytes in/out are written to output_dir/build-metrics.json.
+    """
+    started = time.perf_counter()
+    jobs = args.jobs or os.cpu_count() or 1
+    
     # Create output directory
-    OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+    output_dir.mkdir(parents=True, exist_ok=True)
     
     # Find all test markdown files
-    test_files = sorted(BATCH_DIR.glob("test_*.md"))
+    test_files = sorted(batch_dir.glob("test_*.md"))
     
-    tests = []
+    # Use one date stamp for the whole run so serial and parallel output match
+    date = build_date()
+    
+    css_href = site_stylesheet(output_dir, args, dashboard)
+    
+    # Reuse summaries of tests whose source is unchanged since the last build
+    policy = status_policy(args)
+    fingerprint = generator_fingerprint(css_href, policy)
+    manifest = load_manifest(output_dir, fingerprint)
+    if args.force:
+        manifest['tests'] = {}
+    manifest['generator'] = fingerprint
+    manifest['status_policy'] = policy.key()
+    summaries = {}
+    stale = []
     for test_file in test_files:
+        summary = cached_summary(test_file, output_dir, manifest, args.search)
+        if summary is None:
+            stale.append(test_file)
+        else:
+            summaries[test_file.stem] = summary
+            if args.gzip:
+                ensure_precompressed(output_dir / f"{test_file.stem}.html")
+    if summaries:
+        print(f"Skipping {len(summaries)} unchanged test(s)")
+    scanned = time.perf_counter()
+    
+    per_test = []
+    for test_file, (test, terms, metrics, fields) in render_tests(
+            stale, jobs, executor, args.pipeline, output_dir=output_dir, date=date, css_href=css_href,
+            precompress=args.gzip, search=args.search, md_cache=md_cache, policy=policy):
         print(f"Processing: {test_file.name}")
-        md_content = test_file.read_text(encoding='utf-8')
+        per_test.append(dict(file=test_file.name, **{
+            key: round(value, 6) if isinstance(value, float) else value for key, value in metrics.items()}))
+        summaries[test_file.stem] = test
+        if fields['sha256'] is None:
+            print(f"  {test_file.name} changed while it was read; it will be rendered again next build")
+        manifest['tests'][test_file.stem] = entry = dict(fields, summary=test)
+        if args.search:
+            entry['terms'] = terms
+        print(f"  Created: {test_file.stem}.html")
+    
+    # Forget tests whose source file is gone
+    for stem in set(manifest['tests']) - set(summaries):
+        del manifest['tests'][stem]
+    tests = [summaries[test_file.stem] for test_file in test_files]
+    
+    rendered = time.perf_counter()
+    
+    # Generate index page(s)
+    # A single-batch site with a results store gets its own trends.html
+    write_site_index(tests, manifest, output_dir, date, css_href, args, dashboard,
+                     trends=bool(args.db) and not dashboard)
+    indexed = time.perf_counter()
+    save_manifest(output_dir, manifest)
+    finished = time.perf_counter()
+    
+    phase_totals = {phase: round(sum(entry[phase] for entry in per_test), 6) for phase in PHASES}
+    write_atomic(output_dir / METRICS_NAME, json.dumps({
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'batch': str(batch_dir),
+        'jobs': jobs,
+        'counts': {'tests': len(tests), 'rendered': len(stale), 'unchanged': len(tests) - len(stale)},
+        'bytes': {'in': sum(entry['bytes_in'] for entry in per_test),
+                  'out': sum(entry['bytes_out'] for entry in per_test)},
+        # Wall-clock seconds of each stage of the build
+        'stages': {stage: round(seconds, 6) for stage, seconds in (
+            ('scan', scanned - started), ('tests', rendered - scanned), ('index', indexed - rendered),
+            ('manifest', finished - indexed), ('total', finished - started))},
+        # Per-test phase seconds summed over all rendered tests (CPU time
+        # spread over the workers when --jobs > 1)
+        'phases': phase_totals,
+        'tests': per_test
+    }, indent=1).encode('utf-8'))
+    
+    print(f"\n✅ Generated {len(stale)} test reports ({len(tests) - len(stale)} unchanged) + index page")
+    print("⏱️  " + " | ".join(f"{phase} {seconds:.2f}s" for phase, seconds in phase_totals.items())
+          + f" | index {indexed - rendered:.2f}s | total {finished - started:.2f}s")
+    print(f"📁 Output directory: {output_dir}")
+    return tests
+
+
+def index_only(args: argparse.Namespace):
+    """Rewrite the index pages (and dashboard) from the build manifests without touching test pages."""
+    batches = batch_dirs(args.batch)
+    if len(batches) == 1:
+        index_only_site(OUTPUT_DIR, args)
+        return
+    results = [index_only_site(OUTPUT_DIR / batch.name, args, dashboard=True) for batch in batches]
+    write_dashboard([(batch.name, tests) for batch, tests in zip(batches, results)], OUTPUT_DIR, args)
+
+
+def index_only_site(output_dir: Path, args: argparse.Namespace, dashboard: bool = False) -> list:
+    """Rewrite one site's index pages from its build manifest and return its summaries."""
+    manifest = load_manifest(output_dir)
+    if not manifest['tests']:
+        sys.exit(f"No build manifest in {output_dir}; run 'build' first")
+    if args.search and any('terms' not in entry for entry in manifest['tests'].values()):
+        sys.exit("The build manifest has no search terms; run 'build --search' first")
+    
+    tests = [manifest['tests'][stem]['summary'] for stem in sorted(manifest['tests'])]
+    css_href = site_stylesheet(output_dir, args, dashboard)
+    if css_href and (output_dir / Path(css_href).name).exists():
+        # Test pages built before batches shared the root stylesheet still
+        # link their own copy; keep it (and the link) until the next build
+        css_href = Path(css_href).name
+    write_site_index(tests, manifest, output_dir, build_date(), css_href, args, dashboard,
+                     trends=not dashboard and (output_dir / "trends.html").exists())
+    print(f"\n✅ Rewrote index for {len(tests)} test reports")
+    return tests
+
+
+def stats(args: argparse.Namespace):
+    """Print statistics for each batch, parsing only tests missing from the build manifests."""
+    batches = batch_dirs(args.batch)
+    policy = status_policy(args)
+    if len(batches) == 1:
+        batch_stats(batches[0], OUTPUT_DIR, policy)
+        return
+    for batch in batches:
+        print(f"\n{batch.name}")
+        batch_stats(batch, OUTPUT_DIR / batch.name, policy)
+
+
+def batch_stats(batch_dir: Path, output_dir: Path, policy: StatusPolicy = DEFAULT_STATUS_POLICY):
+    """Print the statistics of one batch."""
+    manifest = load_manifest(output_dir)
+    if manifest.get('status_policy') != policy.key():
+        # Cached statuses were decided under another policy
+        manifest['tests'] = {}
+    tests = []
+    for test_file in sorted(batch_dir.glob("test_*.md")):
+        summary = cached_summary(test_file, output_dir, manifest)
+        if summary is None:
+            summary = parse_test_file(test_file, policy)
+            summary.final_output = None
+        tests.append(summary)
+    
+    total = len(tests)
+    passed = sum(1 for t in tests if t.status == 'PASS')
+    total_time = sum(t.total_duration for t in tests)
+    print(f"Tests:          {total}")
+    print(f"Passed:         {passed}")
+    print(f"Failed:         {total - passed}")
+    print(f"Total time:     {total_time/60:.1f} min")
+    if total:
+        print(f"Mean per test:  {total_time/total/60:.1f} min")
+        slowest = max(tests, key=lambda t: t.total_duration)
+        print(f"Slowest test:   {slowest.filename} ({slowest.total_duration/60:.1f} min)")
+
+
+class StaticSite:
+    """Maps request paths onto a generated site folder for the serve command.
+
+    Computes strong ETags from file contents, memoized per file version
+    (size, mtime, inode) so each file is hashed once rather than per request,
+    picks precompressed .gz siblings and chooses Cache-Control per file.
+    The root is re-resolved on every request, so a --publish symlink swap
+    takes effect immediately.
+    """
+    
+    HASHED_ASSET_RE = re.compile(r'report\.[0-9a-f]{12}\.css')
+    CONTENT_TYPES = {
+        '.html': 'text/html; charset=utf-8',
+        '.css': 'text/css; charset=utf-8',
+        '.json': 'application/json',
+        '.js': 'text/javascript; charset=utf-8',
+        '.svg': 'image/svg+xml'
+    }
+    
+    def __init__(self, root: Path):
+        self.root = root
+        self._etags = {}
+    
+    def resolve(self, url_path: str):
+        """Return the file for a URL path, '/' for a directory missing its slash, or None.
+
+        Hidden files (the manifest, caches, temp files) are never served.
+        """
+        from urllib.parse import unquote
+        parts = [part for part in unquote(url_path.split('?', 1)[0].split('#', 1)[0]).split('/') if part]
+        if any(part.startswith('.') for part in parts):
+            return None
+        root = self.root.resolve()
+        path = root.joinpath(*parts).resolve()
+        if path != root and root not in path.parents:
+            return None
+        if path.is_dir():
+            if not url_path.split('?', 1)[0].endswith('/'):
+                return '/'
+            path = path / "index.html"
+        return path if path.is_file() else None
+    
+    def etag(self, path: Path, st: os.stat_result) -> str:
+        """Strong ETag of a file's current contents."""
+        version = (st.st_size, st.st_mtime_ns, st.st_ino)
+        cached = self._etags.get(path)
+        if cached is None or cached[0] != version:
+            cached = self._etags[path] = (version, f'"{file_digest(path)[:32]}"')
+        return cached[1]
+    
+    def cache_control(self, path: Path) -> str:
+        """Content-hashed stylesheets never change; everything else is revalidated."""
+        if self.HASHED_ASSET_RE.fullmatch(path.name.removesuffix('.gz')):
+            return 'public, max-age=31536000, immutable'
+        return 'no-cache'
+    
+    def content_type(self, path: Path) -> str:
+        """Content-Type header for a file, by extension."""
+        return self.CONTENT_TYPES.get(path.suffix, 'application/octet-stream')
+
+
+def accepts_gzip(accept_encoding: str) -> bool:
+    """Whether an Accept-Encoding header allows gzip.
+
+    An explicit gzip entry decides; '*' only applies when there is none. A
+    missing q-value means 1 and a malformed one makes the coding unacceptable.
+    """
+    qualities = {}
+    for coding in (accept_encoding or '').split(','):
+        name, *params = coding.split(';')
+        q = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities.setdefault(name.strip().lower(), q)
+    q = qualities.get('gzip', qualities.get('*', 0.0))
+    return q > 0
+
+
+def parse_byte_range(header: str, size: int):
+    """Parse a single 'bytes=' Range header into (start, end) inclusive.
+
+    Returns None to ignore the header (unsupported or multiple ranges) and
+    'invalid' for a range that cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    if size == 0:
+        # No byte of an empty file can be selected
+        return 'invalid'
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return 'invalid'
+            return max(0, size - length), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return None
+    if start >= size or end < start:
+        return 'invalid'
+    return start, end
+
+
+def serve(args: argparse.Namespace):
+    """Serve the generated site with caching headers, .gz siblings, ranges and 304s."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from email.utils import formatdate
+    site = StaticSite(Path(args.directory) if args.directory else OUTPUT_DIR)
+    
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        server_version = 'AgadahReports'
         
-        # Extract test info
-        test_info = extract_test_info(md_content)
-        test_info['filename'] = test_file.stem
+        def do_GET(self):
+            self.send_site_file(head=False)
         
-        # Determine status from file size (small files = failed)
-        test_info['status'] = 'PASS' if len(md_content) > 10000 else 'FAIL'
+        def do_HEAD(self):
+            self.send_site_file(head=True)
+        
+        def send_site_file(self, head: bool):
+            path = site.resolve(self.path)
+            if path == '/':
+                location = self.path.split('?', 1)[0] + '/'
+                self.send_response(301)
+                self.send_header('Location', location)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            if path is None:
+                self.send_error(404)
+                return
+            
+            # Serve the precompressed sibling when the client takes gzip and it is current
+            st = path.stat()
+            body, encoding = path, None
+            if accepts_gzip(self.headers.get('Accept-Encoding')):
+                gz_path = path.with_name(path.name + '.gz')
+                try:
+                    gz_st = gz_path.stat()
+                    if gz_st.st_mtime_ns >= st.st_mtime_ns:
+                        body, encoding, st = gz_path, 'gzip', gz_st
+                except FileNotFoundError:
+                    pass
+            etag = site.etag(body, st)
+            
+            if etag in [tag.strip().removeprefix('W/') for tag in self.headers.get('If-None-Match', '').split(',')] \
+                    or self.headers.get('If-None-Match', '').strip() == '*':
+                self.send_response(304)
+                self.send_common_headers(path, etag, encoding)
+                self.end_headers()
+                return
+            
+            size = st.st_size
+            byte_range = None
+            if self.headers.get('If-Range', etag) == etag:
+                byte_range = parse_byte_range(self.headers.get('Range'), size)
+            if byte_range == 'invalid':
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{size}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            start, end = byte_range or (0, size - 1)
+            
+            self.send_response(206 if byte_range else 200)
+            self.send_common_headers(path, etag, encoding)
+            self.send_header('Content-Type', site.content_type(path))
+            self.send_header('Last-Modified', formatdate(st.st_mtime, usegmt=True))
+            self.send_header('Accept-Ranges', 'bytes')
+            if byte_range:
+                self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(end - start + 1))
+            self.end_headers()
+            if head:
+                return
+            with open(body, 'rb') as f:
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    chunk = f.read(min(remaining, 1 << 16))
+                    if not chunk:
+                        break
+                    self.wfile.write(chunk)
+                    remaining -= len(chunk)
         
-        tests.append(test_info)
+        def send_common_headers(self, path, etag, encoding):
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', site.cache_control(path))
+            self.send_header('Vary', 'Accept-Encoding')
+            if encoding:
+                self.send_header('Content-Encoding', encoding)
         
-        # Generate individual test HTML
-        test_html = generate_test_html(test_info, md_content)
-        output_file = OUTPUT_DIR / f"{test_file.stem}.html"
-        output_file.write_text(test_html, encoding='utf-8')
-        print(f"  Created: {output_file.name}")
+        def log_message(self, format, *log_args):
+            if not args.quiet:
+                super().log_message(format, *log_args)
     
-    # Generate index page
-    index_html = generate_index_html(tests)
-    index_file = OUTPUT_DIR / "index.html"
-    index_file.write_text(index_html, encoding='utf-8')
-    print(f"\nCreated index: {index_file.name}")
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    print(f"🌐 Serving {site.root} at http://{args.host}:{server.server_address[1]}/ (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopped serving")
+    finally:
+        server.server_close()
+
+
+def status_policy(args: argparse.Namespace) -> StatusPolicy:
+    """Build the pass/fail policy from the command line options."""
+    return StatusPolicy(
+        success_results=[result.strip() for result in args.success_results.split(',') if result.strip()],
+        step_timeout=args.step_timeout,
+        allow_missing_output=args.allow_missing_output
+    )
+
+
+COMMANDS = {
+    'build': build,
+    'index-only': index_only,
+    'stats': stats,
+    'serve': serve
+}
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    """Parse command line arguments.
+
+    The command defaults to 'build', so `generate_html.py --jobs 4` still works.
+    """
+    parser = argparse.ArgumentParser(description="Generate HTML reports from E2E test markdown files.")
+    subparsers = parser.add_subparsers(dest='command')
+    build_parser = subparsers.add_parser('build', help="render new and changed tests, then the index")
+    build_parser.add_argument('-j', '--jobs', type=int, default=1,
+                              help="number of worker processes for parsing and rendering (0 = all CPUs)")
+    build_parser.add_argument('-f', '--force', action='store_true',
+                              help="ignore the build manifest and re-render every test")
+    build_parser.add_argument('--no-markdown-cache', action='store_true',
+                              help=f"convert every final output afresh instead of using {MARKDOWN_CACHE_NAME}")
+    build_parser.add_argument('--db', metavar='FILE',
+                              help="also store test and step summaries in this SQLite database "
+                                   "(tables batches, tests, steps; view step_runs)")
+    build_parser.add_argument('--watch', action='store_true',
+                              help="after building, keep watching the batch folder and rebuild "
+                                   "as test reports are added or changed")
+    build_parser.add_argument('--pipeline', action='store_true',
+                              help="overlap reading sources, rendering (in --jobs workers) and writing "
+                                   "pages; faster when the batch or output is on a network file system")
+    build_parser.add_argument('--publish', metavar='LINK',
+                              help="build into a fresh directory next to LINK and publish it all at "
+                                   "once by atomically repointing the symlink LINK at it")
+    index_parser = subparsers.add_parser('index-only', help="rewrite the index from the build manifest")
+    for sub in (build_parser, index_parser):
+        sub.add_argument('--external-css', action='store_true',
+                         help="link a shared, content-hashed report.<hash>.css instead of inlining the styles")
+        sub.add_argument('--gzip', action='store_true',
+                         help="also write precompressed .gz siblings of every page and stylesheet")
+        sub.add_argument('--page-size', type=int, default=0,
+                         help="split the index into pages of this many tests, with an index.json "
+                              "manifest (0 = single page)")
+        sub.add_argument('--search', action='store_true',
+                         help="build a sharded search index and add a search box to the index")
+    stats_parser = subparsers.add_parser('stats', help="print batch statistics without writing anything")
+    serve_parser = subparsers.add_parser('serve', help="serve the generated site over HTTP")
+    serve_parser.add_argument('--host', default='127.0.0.1', help="address to listen on (default 127.0.0.1)")
+    serve_parser.add_argument('--port', type=int, default=8000, help="port to listen on (default 8000)")
+    serve_parser.add_argument('--directory', metavar='DIR',
+                              help="site folder (or --publish symlink) to serve (default: the output folder)")
+    serve_parser.add_argument('-q', '--quiet', action='store_true', help="don't log each request")
+    for sub in (build_parser, stats_parser):
+        sub.add_argument('--success-results', default='SUCCESS', metavar='RESULTS',
+                         help="comma-separated step results that count as success; a test fails if "
+                              "any step has another result (default: SUCCESS)")
+        sub.add_argument('--step-timeout', type=float, metavar='SECONDS',
+                         help="also fail tests with a step that took longer than this")
+        sub.add_argument('--allow-missing-output', action='store_true',
+                         help="don't fail tests whose report has no final output")
+    for sub in (build_parser, index_parser, stats_parser):
+        sub.add_argument('--profile', metavar='FILE',
+                         help="run under cProfile and dump pstats data to FILE (with --jobs > 1 "
+                              "the worker processes are not profiled)")
+        sub.add_argument('-b', '--batch', action='append', metavar='DIR',
+                         help=f"batch folder, or glob of folders, to report on (repeatable; default "
+                              f"{BATCH_DIR.name}). With several batches each gets its own subfolder "
+                              f"and index.html becomes a dashboard of them")
     
-    print(f"\n✅ Generated {len(tests)} test reports + index page")
-    print(f"📁 Output directory: {OUTPUT_DIR}")
+    argv = sys.argv[1:] if argv is None else list(argv)
+    if not argv or (argv[0] not in COMMANDS and argv[0] not in ('-h', '--help')):
+        argv.insert(0, 'build')
+    return parser.parse_args(argv)
 
 
-if __name__ == "__main__":
-    main()
+def main(argv=None):
+    """Main function to generate all HTML reports."""
+    args = parse_args(argv)
+    if not getattr(args, 'profile', None):
+        COMMANDS[args.command](args)
+        return
+    import cProfile
+    import pstats
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(COMMANDS[args.command], args)
+    finally:
+        profiler.dump_stats(args.profile)
+        print(f"\n📈 Profile written to {args.profile}; slowest calls (cumulative):")
+        pstats.Stats(profiler).sort_stats('cumulative').print_stats(15)
+
 
+if __name__ == "__main__":
+    main()
\ No newline at end of file